@@ -1,20 +1,72 @@
 from odds_api import OddsAPI
+from config import LAY_MARKETS
+from regions import bookmaker_region
+from team_names import TeamNameIndex
+from sinks import create_sinks
+from stakes import round_stakes, stake_legs
+from metrics import Metrics
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from collections import defaultdict
+import heapq
 import logging
-from difflib import get_close_matches
+import math
+import time
+
+# Slack for float rounding when comparing implied probability bounds to the cutoff
+PRUNE_TOLERANCE = 1e-9
 
 class ArbitrageFinder:
     def __init__(self, config):
         self.config = config
-        self.odds_api = OddsAPI(config)
+        self.metrics = Metrics()
+        self.odds_api = OddsAPI(config, self.metrics)
+        self.log_listener = None
         self.setup_logging()
-        self.team_name_cache = {}  # Cache for standardized team names
+        self.team_names = TeamNameIndex(config.team_aliases_file)
+        self.arbitrage_engine = self.create_engine()
+        self.sink = create_sinks(config.sinks)
 
     def setup_logging(self):
-        logging.basicConfig(filename='arbitrage_finder.log', level=logging.INFO,
-                            format='%(asctime)s - %(levelname)s - %(message)s')
+        level = getattr(logging, self.config.log_level.upper(), logging.INFO)
+        root = logging.getLogger()
+        if root.handlers:
+            # Logging was already configured, e.g. by an earlier finder in this process
+            root.setLevel(level)
+            return
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        file_handler = logging.FileHandler(self.config.log_file)
+        file_handler.setFormatter(formatter)
+        if self.config.log_queue:
+            # Callers only enqueue records; formatting and file writes happen
+            # on the listener's background thread.
+            from logging.handlers import QueueHandler, QueueListener
+            from queue import SimpleQueue
+            log_queue = SimpleQueue()
+            self.log_listener = QueueListener(log_queue, file_handler)
+            self.log_listener.start()
+            handler = QueueHandler(log_queue)
+        else:
+            handler = file_handler
+        logging.basicConfig(level=level, handlers=[handler])
+
+    def close(self):
+        self.odds_api.close()
+        if self.sink:
+            self.sink.close()
+            self.sink = None
+        self.team_names.save()
+        if self.log_listener:
+            self.log_listener.stop()
+            self.log_listener = None
+
+    def create_engine(self):
+        if self.config.engine == 'numpy':
+            from vectorized_engine import VectorizedEngine, np
+            if np is not None:
+                return VectorizedEngine(self)
+            logging.warning("NumPy is not installed. Falling back to the Python engine.")
+        return self
 
     def find_arbitrage(self):
         try:
@@ -29,140 +81,325 @@ class ArbitrageFinder:
             total_arbs = 0
             all_arbs = []
             
-            for sport in sports:
+            # Each sport is analyzed as soon as its odds arrive and then
+            # dropped, so sinks see its opportunities without waiting for
+            # the slowest sport
+            sports_by_key = {sport['key']: sport for sport in sports}
+            for sport_key, odds in self.odds_api.get_all_odds(list(sports_by_key)):
+                sport = sports_by_key[sport_key]
                 try:
-                    odds = self.odds_api.get_odds(sport['key'])
-                    if self.odds_api.api_limit_reached:
-                        logging.warning("API limit reached. Stopping analysis.")
-                        break
                     if odds:
                         total_events += len(odds)
-                        arbs = self.calculate_arbitrage(odds)
+                        arbs = []
+                        started = time.perf_counter()
+                        output_seconds = 0.0
+                        for arb in self.arbitrage_engine.iter_arbitrage(odds):
+                            if self.sink:
+                                emit_started = time.perf_counter()
+                                self.sink.emit(self.opportunity_record(sport['key'], arb))
+                                output_seconds += time.perf_counter() - emit_started
+                            arbs.append(arb)
+                        self.metrics.add_time('analyze', time.perf_counter() - started - output_seconds, sport['key'])
+                        self.metrics.count('events', len(odds), sport['key'])
+                        self.metrics.count('opportunities', len(arbs), sport['key'])
                         total_arbs += len(arbs)
-                        all_arbs.extend(arbs)
+                        if not self.config.stream_only:
+                            all_arbs.extend(arbs)
                         if not self.config.unformatted and arbs:
+                            output_started = time.perf_counter()
                             self.output_results(arbs, sport['title'])
+                            output_seconds += time.perf_counter() - output_started
+                        self.metrics.add_time('output', output_seconds, sport['key'])
                 except Exception as e:
                     logging.error(f"Error processing sport {sport['key']}: {str(e)}")
                     continue
+            if self.odds_api.api_limit_reached:
+                logging.warning("API limit reached. Only the sports fetched before the limit were analyzed.")
 
-            return {
+            results = {
                 "total_events": total_events,
                 "total_arbitrage_opportunities": total_arbs,
+                "markets": self.config.markets,
                 "arbitrage_opportunities": all_arbs,
                 "api_usage": {
                     "remaining_requests": self.odds_api.remaining_requests,
                     "used_requests": self.odds_api.used_requests
-                } if not self.config.offline_file else None
+                } if not self.config.offline_file else None,
+                "metrics": self.metrics.snapshot()
             }
+            if self.sink:
+                summary = {key: value for key, value in results.items() if key != "arbitrage_opportunities"}
+                self.sink.emit(dict(summary, type='summary'))
+            return results
         except Exception as e:
             logging.error(f"Fatal error in find_arbitrage: {str(e)}")
             return self.create_empty_result()
 
+    def opportunity_record(self, sport_key, arb):
+        return {
+            'type': 'opportunity',
+            'sport': sport_key,
+            'detected_at': datetime.now(timezone.utc).isoformat(),
+            'opportunity': arb
+        }
+
     def create_empty_result(self):
         return {
             "total_events": 0,
             "total_arbitrage_opportunities": 0,
+            "markets": self.config.markets,
             "arbitrage_opportunities": [],
-            "api_usage": None
+            "api_usage": None,
+            "metrics": self.metrics.snapshot()
         }
 
     def calculate_arbitrage(self, odds):
-        arbs = []
-        for event in odds:
-            best_odds, bookmakers, points = self.get_best_odds(event)
-            if best_odds:
-                try:
-                    if self.config.market == 'h2h':
-                        implied_prob = sum(1 / odd for odd in best_odds.values())
-                    elif self.config.market == 'spreads':
-                        # Filter out the 'spread' key and verify bookmakers are different
-                        odds_without_spread = {k: v for k, v in best_odds.items() if k != 'spread'}
-                        teams = list(odds_without_spread.keys())
-                        if len(teams) == 2 and bookmakers[teams[0]] != bookmakers[teams[1]]:
-                            implied_prob = sum(1 / odd for odd in odds_without_spread.values())
-                        else:
-                            logging.warning("Invalid spread bet setup - skipping")
-                            continue
-                    elif self.config.market == 'totals':
-                        implied_prob = 1/best_odds['Over'] + 1/best_odds['Under']
-                    else:
-                        logging.warning(f"Unsupported market: {self.config.market}")
-                        continue
+        return list(self.iter_arbitrage(odds))
 
-                    logging.info(f"Event: {event['home_team']} vs {event['away_team']}, Implied Prob: {implied_prob}")
-                    
-                    if implied_prob < 1:
-                        profit_margin = (1 / implied_prob - 1) * 100
-                        logging.info(f"Potential arbitrage found! Profit Margin: {profit_margin}%")
-                        if profit_margin >= self.config.cutoff:
-                            arb = {
-                                'event': event['home_team'] + ' vs ' + event['away_team'],
-                                'profit_margin': profit_margin,
-                                'best_odds': best_odds,
-                                'bookmakers': bookmakers,
-                                'commence_time': event['commence_time'],
-                                'market': self.config.market
-                            }
-                            if points is not None:
-                                arb['points'] = points
-                            arbs.append(arb)
-                            logging.info(f"Added arbitrage opportunity with {profit_margin:.2f}% profit margin")
-                        else:
-                            logging.info(f"Profit margin {profit_margin}% below cutoff {self.config.cutoff}%")
+    def iter_arbitrage(self, odds):
+        """Yield each opportunity as soon as its event has been analyzed."""
+        best_odds_seconds = 0.0
+        pruned_events = 0
+        limit = self.implied_limit()
+        try:
+            for event in odds:
+                started = time.perf_counter()
+                markets = self.viable_markets(event, self.config.markets, limit)
+                best_odds_by_market = self.get_best_odds(event, markets) if markets else {}
+                best_odds_seconds += time.perf_counter() - started
+                if not markets:
+                    pruned_events += 1
+                    continue
+                for market in markets:
+                    if market not in best_odds_by_market:
+                        logging.warning("Unsupported market: %s", market)
+                        continue
+                    best_odds, bookmakers, points = best_odds_by_market[market]
+                    if best_odds:
+                        arb = self.evaluate_opportunity(event, market, best_odds, bookmakers, points)
+                        if arb:
+                            yield arb
                     else:
-                        logging.info("No arbitrage opportunity")
-                except Exception as e:
-                    logging.error(f"Error calculating arbitrage for event: {str(e)}")
+                        logging.info("No valid %s odds for %s vs %s", market, event.home_team, event.away_team)
+        finally:
+            # Part of the caller's 'analyze' time, recorded once per call
+            self.metrics.add_time('best_odds', best_odds_seconds)
+            self.metrics.count('pruned_events', pruned_events)
+
+    def implied_limit(self):
+        """Highest implied probability sum an opportunity can have and still meet the cutoff."""
+        if self.config.cutoff <= -100:
+            return 1.0
+        return min(1.0, 1 / (1 + self.config.cutoff / 100))
+
+    def viable_markets(self, event, markets, limit):
+        """
+        The markets whose implied probability bound is within limit. The
+        bounds only read the event's quote columns, so markets that cannot
+        reach the cutoff skip the tables, team name matching and logging.
+        """
+        viable = []
+        for market in markets:
+            bound = self.implied_bound(event, market)
+            if bound is None or bound <= limit + PRUNE_TOLERANCE:
+                viable.append(market)
+        return viable
+
+    def implied_bound(self, event, market):
+        """
+        Lower bound on the implied probability sum of the market's best
+        odds, from the best price quoted for each outcome. None when the
+        market has no bound and must always be evaluated.
+        """
+        if market not in ('h2h', 'outrights', 'totals', 'spreads'):
+            return None
+        quotes = event.markets.get(market)
+        if quotes is None:
+            return math.inf
+
+        if market == 'totals':
+            by_points = {}
+            for name, price, total_points in zip(quotes.names, quotes.prices, quotes.points):
+                if total_points is None or name not in ('Over', 'Under'):
                     continue
+                best = by_points.setdefault(total_points, {'Over': 0, 'Under': 0})
+                if price > best[name]:
+                    best[name] = price
+            return min((1/best['Over'] + 1/best['Under'] for best in by_points.values()
+                        if best['Over'] > 0 and best['Under'] > 0), default=math.inf)
+
+        if market == 'spreads':
+            # Names are only matched to the event's teams later, but the home
+            # and away sides are differently named outcomes, so neither can
+            # beat the two best prices of distinct names at the same point
+            by_points = defaultdict(dict)
+            for name, price, point in zip(quotes.names, quotes.prices, quotes.points):
+                if point is not None and price > by_points[point].get(name, 0):
+                    by_points[point][name] = price
+            bound = math.inf
+            for best in by_points.values():
+                if len(best) > 1:
+                    first, second = heapq.nlargest(2, best.values())
+                    bound = min(bound, 1/first + 1/second)
+            return bound
+
+        best = {}
+        for name, price in zip(quotes.names, quotes.prices):
+            if price <= 0:
+                # Left for evaluate_opportunity to reject
+                return None
+            if price > best.get(name, 0):
+                best[name] = price
+        return sum(1 / price for price in best.values()) if len(best) > 1 else math.inf
+
+    def evaluate_opportunity(self, event, market, best_odds, bookmakers, points):
+        """
+        Turn one market's best odds for an event into an arbitrage
+        opportunity dict, or None if it is not an arb above the cutoff.
+        """
+        try:
+            if market in ('h2h', 'outrights'):
+                implied_prob = sum(1 / odd for odd in best_odds.values())
+            elif market in LAY_MARKETS:
+                # points holds the back/lay details for lay markets. The outlay
+                # is the back stake plus the lay liability, as in stake_legs
+                implied_prob = 1 / points['back_price_effective'] + (points['lay_price'] - 1) / (
+                    points['lay_price'] - points['commission'])
+            elif market == 'spreads':
+                # Filter out the 'spread' key and verify bookmakers are different
+                odds_without_spread = {k: v for k, v in best_odds.items() if k != 'spread'}
+                teams = list(odds_without_spread.keys())
+                if len(teams) == 2 and bookmakers[teams[0]] != bookmakers[teams[1]]:
+                    implied_prob = sum(1 / odd for odd in odds_without_spread.values())
+                else:
+                    logging.warning("Invalid spread bet setup - skipping")
+                    return None
             else:
-                logging.info(f"No valid odds for {event['home_team']} vs {event['away_team']}")
-        return arbs
-
-    def get_best_odds(self, event):
-        if self.config.market == 'h2h':
-            return self.get_best_odds_h2h(event)
-        elif self.config.market == 'totals':
-            return self.get_best_odds_totals(event)
-        elif self.config.market == 'spreads':
-            return self.get_best_odds_spreads(event)
-        else:
-            logging.warning(f"Unsupported market: {self.config.market}")
-            return None, None, None
+                implied_prob = 1/best_odds['Over'] + 1/best_odds['Under']
+
+            logging.info("Event: %s vs %s, Market: %s, Implied Prob: %s",
+                         event.home_team, event.away_team, market, implied_prob)
+
+            if implied_prob < 1:
+                profit_margin = (1 / implied_prob - 1) * 100
+                logging.info("Potential arbitrage found! Profit Margin: %s%%", profit_margin)
+                if profit_margin >= self.config.cutoff:
+                    arb = {
+                        'event': self.event_name(event),
+                        'event_id': event.id,
+                        'profit_margin': profit_margin,
+                        'best_odds': best_odds,
+                        'bookmakers': bookmakers,
+                        'commence_time': event.commence_time,
+                        'market': market
+                    }
+                    if market in LAY_MARKETS:
+                        arb.update(points)
+                    elif points is not None:
+                        arb['points'] = points
+                    arb['regions'] = self.bookmaker_regions(event, bookmakers)
+                    logging.info("Added arbitrage opportunity with %.2f%% profit margin", profit_margin)
+                    return arb
+                else:
+                    logging.info("Profit margin %s%% below cutoff %s%%", profit_margin, self.config.cutoff)
+            else:
+                logging.info("No arbitrage opportunity")
+        except Exception as e:
+            logging.error("Error calculating arbitrage for event: %s", e)
+        return None
+
+    def event_name(self, event):
+        if event.home_team and event.away_team:
+            return event.home_team + ' vs ' + event.away_team
+        # Outright events have no home/away teams
+        return event.sport_title or event.id
+
+    def bookmaker_regions(self, event, bookmakers):
+        """Tag each outcome of an opportunity with the region of its bookmaker."""
+        keys = {bookmaker.title: bookmaker.key for bookmaker in event.bookmakers}
+        return {outcome: bookmaker_region(keys.get(title), self.config.regions)
+                for outcome, title in bookmakers.items()}
+
+    # Per-market (new table, {API market key: add the market's quotes},
+    # pick best) handlers used by get_best_odds to walk each event's
+    # bookmakers only once. Lay markets also read their base market's
+    # back prices.
+    MARKET_HANDLERS = {
+        'h2h': ('new_h2h_table', {'h2h': 'add_h2h_outcomes'}, 'best_h2h_odds'),
+        'totals': ('new_totals_table', {'totals': 'add_totals_outcomes'}, 'best_totals_odds'),
+        'spreads': ('new_spreads_table', {'spreads': 'add_spreads_outcomes'}, 'best_spreads_odds'),
+        'outrights': ('new_h2h_table', {'outrights': 'add_h2h_outcomes'}, 'best_h2h_odds'),
+        'h2h_lay': ('new_lay_table', {'h2h': 'add_back_outcomes', 'h2h_lay': 'add_lay_outcomes'}, 'best_lay_odds'),
+        'outrights_lay': ('new_lay_table', {'outrights': 'add_back_outcomes', 'outrights_lay': 'add_lay_outcomes'},
+                          'best_lay_odds'),
+    }
+
+    def get_best_odds(self, event, markets=None):
+        """
+        Walk each of the event's quote columns once and return a dict mapping
+        each supported market to its (best_odds, bookmakers, points) tuple.
+        """
+        adders = defaultdict(list)  # API market key -> [(add outcomes, table)]
+        finishers = {}
+        for market in markets or self.config.markets:
+            if market in self.MARKET_HANDLERS:
+                new_table, add_outcomes, best_odds = self.MARKET_HANDLERS[market]
+                table = getattr(self, new_table)(event)
+                for key, add in add_outcomes.items():
+                    adders[key].append((getattr(self, add), table))
+                finishers[market] = (getattr(self, best_odds), table)
+
+        for key, quotes in event.markets.items():
+            for add, table in adders.get(key, ()):
+                add(table, quotes)
+
+        return {market: best_odds(table) for market, (best_odds, table) in finishers.items()}
 
     def get_best_odds_h2h(self, event):
-        best_odds = {}
-        bookmakers = {}
-        if 'bookmakers' in event and isinstance(event['bookmakers'], list):
-            for bookmaker in event['bookmakers']:
-                if 'markets' in bookmaker and isinstance(bookmaker['markets'], list):
-                    for market in bookmaker['markets']:
-                        if market['key'] == 'h2h':
-                            for outcome in market['outcomes']:
-                                if outcome['name'] not in best_odds or outcome['price'] > best_odds[outcome['name']]:
-                                    best_odds[outcome['name']] = outcome['price']
-                                    bookmakers[outcome['name']] = bookmaker['title']
-        return (best_odds, bookmakers, None) if len(best_odds) > 1 else (None, None, None)
+        return self.get_best_odds(event, ['h2h'])['h2h']
 
     def get_best_odds_totals(self, event):
-        odds_by_points = defaultdict(lambda: {'Over': 0, 'Under': 0})
-        bookmakers_by_points = defaultdict(lambda: {'Over': '', 'Under': ''})
-        
-        if 'bookmakers' in event and isinstance(event['bookmakers'], list):
-            for bookmaker in event['bookmakers']:
-                if 'markets' in bookmaker and isinstance(bookmaker['markets'], list):
-                    for market in bookmaker['markets']:
-                        if market['key'] == 'totals':
-                            for outcome in market['outcomes']:
-                                total_points = outcome.get('point')
-                                if total_points is not None:
-                                    if outcome['name'] == 'Over' and outcome['price'] > odds_by_points[total_points]['Over']:
-                                        odds_by_points[total_points]['Over'] = outcome['price']
-                                        bookmakers_by_points[total_points]['Over'] = bookmaker['title']
-                                    elif outcome['name'] == 'Under' and outcome['price'] > odds_by_points[total_points]['Under']:
-                                        odds_by_points[total_points]['Under'] = outcome['price']
-                                        bookmakers_by_points[total_points]['Under'] = bookmaker['title']
-        
+        return self.get_best_odds(event, ['totals'])['totals']
+
+    def get_best_odds_spreads(self, event):
+        return self.get_best_odds(event, ['spreads'])['spreads']
+
+    def new_h2h_table(self, event):
+        return {'best_odds': {}, 'bookmakers': {}}
+
+    def add_h2h_outcomes(self, table, quotes):
+        best_odds = table['best_odds']
+        bookmakers = table['bookmakers']
+        for bookmaker, name, price, _ in quotes:
+            if name not in best_odds or price > best_odds[name]:
+                best_odds[name] = price
+                bookmakers[name] = bookmaker.title
+
+    def best_h2h_odds(self, table):
+        best_odds = table['best_odds']
+        return (best_odds, table['bookmakers'], None) if len(best_odds) > 1 else (None, None, None)
+
+    def new_totals_table(self, event):
+        return {
+            'odds_by_points': defaultdict(lambda: {'Over': 0, 'Under': 0}),
+            'bookmakers_by_points': defaultdict(lambda: {'Over': '', 'Under': ''})
+        }
+
+    def add_totals_outcomes(self, table, quotes):
+        odds_by_points = table['odds_by_points']
+        bookmakers_by_points = table['bookmakers_by_points']
+        for bookmaker, name, price, total_points in quotes:
+            if total_points is not None:
+                if name == 'Over' and price > odds_by_points[total_points]['Over']:
+                    odds_by_points[total_points]['Over'] = price
+                    bookmakers_by_points[total_points]['Over'] = bookmaker.title
+                elif name == 'Under' and price > odds_by_points[total_points]['Under']:
+                    odds_by_points[total_points]['Under'] = price
+                    bookmakers_by_points[total_points]['Under'] = bookmaker.title
+
+    def best_totals_odds(self, table):
+        odds_by_points = table['odds_by_points']
+        bookmakers_by_points = table['bookmakers_by_points']
         best_odds = None
         best_bookmakers = None
         best_total_points = None
@@ -184,62 +421,53 @@ class ArbitrageFinder:
 
     def standardize_team_name(self, team_name, event_teams):
         """
-        Standardize team names using fuzzy matching.
-        Cache results to improve performance.
+        Standardize team names against the event's teams.
+        Exact and normalized matches are tried before fuzzy matching.
         """
-        if not team_name:
-            return None
-            
-        cache_key = (team_name.lower(), tuple(sorted(event_teams)))
-        if cache_key in self.team_name_cache:
-            return self.team_name_cache[cache_key]
-
-        matches = get_close_matches(team_name.lower(), [t.lower() for t in event_teams], n=1, cutoff=0.6)
-        if matches:
-            standardized = next(t for t in event_teams if t.lower() == matches[0])
-            self.team_name_cache[cache_key] = standardized
-            return standardized
-        
-        logging.warning(f"No match found for team name: {team_name}")
-        return None
+        return self.team_names.lookup(team_name, event_teams)
+
+    def new_spreads_table(self, event):
+        return {
+            'event': event,
+            'event_teams': [event.home_team, event.away_team],
+            'odds_by_points': defaultdict(lambda: {
+                'Home': {'odds': 0, 'team': None, 'bookmaker': None},
+                'Away': {'odds': 0, 'team': None, 'bookmaker': None}
+            })
+        }
+
+    def add_spreads_outcomes(self, table, quotes):
+        event = table['event']
+        event_teams = table['event_teams']
+        odds_by_points = table['odds_by_points']
+        for bookmaker, name, price, point in quotes:
+            if point is not None:
+                # Standardize team name
+                team_name = self.standardize_team_name(name, event_teams)
+                if not team_name:
+                    continue
+
+                # Determine if team is home or away
+                side = 'Home' if team_name == event.home_team else 'Away'
+
+                # Store odds if better than existing
+                if price > odds_by_points[point][side]['odds']:
+                    odds_by_points[point][side] = {
+                        'odds': price,
+                        'team': team_name,
+                        'bookmaker': bookmaker.title
+                    }
+
+    def best_spreads_odds(self, table):
+        odds_by_points = table['odds_by_points']
 
-    def get_best_odds_spreads(self, event):
-        event_teams = [event['home_team'], event['away_team']]
-        odds_by_points = defaultdict(lambda: {
-            'Home': {'odds': 0, 'team': None, 'bookmaker': None},
-            'Away': {'odds': 0, 'team': None, 'bookmaker': None}
-        })
-        
-        if 'bookmakers' in event and isinstance(event['bookmakers'], list):
-            for bookmaker in event['bookmakers']:
-                if 'markets' in bookmaker and isinstance(bookmaker['markets'], list):
-                    for market in bookmaker['markets']:
-                        if market['key'] == 'spreads':
-                            for outcome in market['outcomes']:
-                                point = outcome.get('point')
-                                if point is not None:
-                                    # Standardize team name
-                                    team_name = self.standardize_team_name(outcome['name'], event_teams)
-                                    if not team_name:
-                                        continue
-
-                                    # Determine if team is home or away
-                                    side = 'Home' if team_name == event['home_team'] else 'Away'
-                                    
-                                    # Store odds if better than existing
-                                    if outcome['price'] > odds_by_points[point][side]['odds']:
-                                        odds_by_points[point][side] = {
-                                            'odds': outcome['price'],
-                                            'team': team_name,
-                                            'bookmaker': bookmaker['title']
-                                        }
-        
         # Find the best arbitrage opportunity across all point spreads
         best_odds = None
         best_bookmakers = None
         best_points = None
         best_implied_prob = float('inf')
 
+        log_details = logging.getLogger().isEnabledFor(logging.INFO)
         for point, sides in odds_by_points.items():
             # Verify we have odds for both sides and different bookmakers
             if (sides['Home']['odds'] > 0 and sides['Away']['odds'] > 0 and
@@ -250,10 +478,13 @@ class ArbitrageFinder:
                 away_prob = 1/sides['Away']['odds']
                 implied_prob = home_prob + away_prob
                 
-                logging.info(f"Checking spread {point}:")
-                logging.info(f"  Home: {sides['Home']['team']} @ {sides['Home']['odds']} ({sides['Home']['bookmaker']}) - Implied prob: {home_prob:.4f}")
-                logging.info(f"  Away: {sides['Away']['team']} @ {sides['Away']['odds']} ({sides['Away']['bookmaker']}) - Implied prob: {away_prob:.4f}")
-                logging.info(f"  Total implied prob: {implied_prob:.4f}")
+                if log_details:
+                    logging.info("Checking spread %s:", point)
+                    logging.info("  Home: %s @ %s (%s) - Implied prob: %.4f",
+                                 sides['Home']['team'], sides['Home']['odds'], sides['Home']['bookmaker'], home_prob)
+                    logging.info("  Away: %s @ %s (%s) - Implied prob: %.4f",
+                                 sides['Away']['team'], sides['Away']['odds'], sides['Away']['bookmaker'], away_prob)
+                    logging.info("  Total implied prob: %.4f", implied_prob)
                 
                 if implied_prob < 1:  # Changed from best_implied_prob to 1
                     best_implied_prob = implied_prob
@@ -267,10 +498,11 @@ class ArbitrageFinder:
                     }
                     best_points = point
                     
-                    logging.info(f"Found arbitrage opportunity at {point} points:")
-                    logging.info(f"  Home: {sides['Home']['team']} @ {sides['Home']['odds']} ({sides['Home']['bookmaker']})")
-                    logging.info(f"  Away: {sides['Away']['team']} @ {sides['Away']['odds']} ({sides['Away']['bookmaker']})")
-                    logging.info(f"  Implied Probability: {implied_prob}")
+                    if log_details:
+                        logging.info("Found arbitrage opportunity at %s points:", point)
+                        logging.info("  Home: %s @ %s (%s)", sides['Home']['team'], sides['Home']['odds'], sides['Home']['bookmaker'])
+                        logging.info("  Away: %s @ %s (%s)", sides['Away']['team'], sides['Away']['odds'], sides['Away']['bookmaker'])
+                        logging.info("  Implied Probability: %s", implied_prob)
 
         if best_odds:
             # Add spread information to best_odds
@@ -279,6 +511,75 @@ class ArbitrageFinder:
         else:
             return None, None, None
 
+    def new_lay_table(self, event):
+        # runner -> [best effective back price, its bookmaker, raw price,
+        #            runner-up effective back price, its bookmaker, raw price]
+        # and runner -> [lowest lay cost, exchange, lay price, commission]
+        return {'backs': {}, 'lays': {}}
+
+    def add_back_outcomes(self, table, quotes):
+        backs = table['backs']
+        for bookmaker, name, price, _ in quotes:
+            commission = self.config.exchange_commission(bookmaker.key)
+            # Winnings backed on an exchange are reduced by its commission
+            effective = 1 + (price - 1) * (1 - commission)
+            best = backs.get(name)
+            if best is None:
+                backs[name] = [effective, bookmaker.title, price, 0, None, None]
+            elif effective > best[0]:
+                best[3:6] = best[0:3]
+                best[0:3] = [effective, bookmaker.title, price]
+            elif effective > best[3]:
+                best[3:6] = [effective, bookmaker.title, price]
+
+    def add_lay_outcomes(self, table, quotes):
+        lays = table['lays']
+        for bookmaker, name, price, _ in quotes:
+            commission = self.config.exchange_commission(bookmaker.key)
+            if price <= 1 or commission >= 1:
+                continue
+            # Liability per unit returned when the runner loses: lower is better
+            cost = (price - 1) / (price - commission)
+            best = lays.get(name)
+            if best is None or cost < best[0]:
+                lays[name] = [cost, bookmaker.title, price, commission]
+
+    def best_lay_odds(self, table):
+        """
+        Best back/lay pair across all runners: back at the highest
+        commission-adjusted price and lay at the cheapest exchange, never
+        on the same bookmaker. The third element holds the pair's details.
+        """
+        best = None
+        best_implied_prob = float('inf')
+        for runner, (cost, exchange, lay_price, commission) in table['lays'].items():
+            back = table['backs'].get(runner)
+            if back is None:
+                continue
+            effective, bookmaker, back_price = back[0:3] if back[1] != exchange else back[3:6]
+            if bookmaker is None:
+                continue
+            # Total outlay, back stake plus liability, per unit returned either way
+            implied_prob = 1 / effective + cost
+            if implied_prob < best_implied_prob:
+                best_implied_prob = implied_prob
+                best = (runner, effective, bookmaker, back_price, exchange, lay_price, commission)
+
+        if best is None:
+            return None, None, None
+        runner, effective, bookmaker, back_price, exchange, lay_price, commission = best
+        best_odds = {f"Back {runner}": back_price, f"Lay {runner}": lay_price}
+        bookmakers = {f"Back {runner}": bookmaker, f"Lay {runner}": exchange}
+        details = {
+            'runner': runner,
+            'back_price_effective': effective,
+            'lay_price': lay_price,
+            'commission': commission,
+            # Lay stake per unit of back stake that equalizes both outcomes
+            'lay_stake_ratio': effective / (lay_price - commission)
+        }
+        return best_odds, bookmakers, details
+
     def output_results(self, arbs, sport_title):
         if arbs:
             logging.info(f"\nArbitrage opportunities for {sport_title}:")
@@ -346,6 +647,8 @@ class ArbitrageFinder:
         logging.info(f"\nGuaranteed profit: ${profit:.2f} ({(profit/total_stake)*100:.2f}%)")
 
     def calculate_bets(self, arb, bet_amount, rounding):
+        if arb.get('market') in LAY_MARKETS:
+            return self.calculate_lay_bets(arb, bet_amount, rounding)
         try:
             # Exclude 'spread' key from odds and ensure consistent team names
             odds = {team: odd for team, odd in arb['best_odds'].items() if team != 'spread'}
@@ -359,40 +662,16 @@ class ArbitrageFinder:
             bets = {team: bet_amount * (prob / total_implied_prob) for team, prob in implied_probs.items()}
             
             if rounding:
-                # Round bets while maintaining total stake
-                rounded_bets = {}
-                remaining_stake = bet_amount
-                teams = list(odds.keys())  # Use filtered odds keys
-                
-                # Check if rounding unit is too large for the bet amount
-                if rounding > bet_amount:
-                    logging.error(f"Rounding unit (${rounding}) is larger than bet amount (${bet_amount})")
+                # Whole units of the rounding amount that keep the best guaranteed profit
+                legs = [(team, team, arb['bookmakers'].get(team), 1, odd) for team, odd in odds.items()]
+                rounded_bets = round_stakes(legs, bet_amount, rounding)
+                if rounded_bets is None:
+                    logging.error(f"Rounding unit (${rounding}) is too large for bet amount (${bet_amount})")
                     return bet_amount, bets, {team: bet * odds[team] for team, bet in bets.items()}
-                
-                # Round all but the last bet
-                for team in teams[:-1]:
-                    rounded_bet = round(bets[team] / rounding) * rounding
-                    rounded_bets[team] = rounded_bet
-                    remaining_stake -= rounded_bet
-                
-                # Handle the last bet carefully
-                if remaining_stake < rounding / 2:
-                    # Redistribute the small remainder across other bets
-                    logging.warning(f"Remaining stake (${remaining_stake:.2f}) is too small to round. Redistributing...")
-                    adjustment = remaining_stake / (len(teams) - 1)
-                    for team in teams[:-1]:
-                        rounded_bets[team] += adjustment
-                    rounded_bets[teams[-1]] = 0
-                else:
-                    # Round the remaining stake normally
-                    rounded_bets[teams[-1]] = round(remaining_stake / rounding) * rounding
-                
-                # Verify the rounded bets
-                total_rounded = sum(rounded_bets.values())
-                if abs(total_rounded - bet_amount) > 0.01:  # Allow for small floating-point differences
-                    logging.warning(f"Rounding resulted in stake mismatch. Original: ${bet_amount:.2f}, Rounded: ${total_rounded:.2f}")
-                
-                bets = rounded_bets
+                bets = dict(zip(odds, rounded_bets))
+                total_rounded = sum(bets.values())
+                if bet_amount - total_rounded > 0.01:
+                    logging.info(f"Rounded stakes total ${total_rounded:.2f} of the ${bet_amount:.2f} available")
             
             total_stake = sum(bets.values())
             returns = {team: bets[team] * odds[team] for team in odds.keys()}
@@ -430,6 +709,27 @@ class ArbitrageFinder:
             print("Error: An unexpected error occurred. Check the logs for details.")
             return 0, {}, {}
 
+    def calculate_lay_bets(self, arb, bet_amount, rounding):
+        """
+        Back stake and matching lay stake for a back/lay opportunity.
+        The bet amount is the total stake, the back stake plus the lay
+        liability, and the returns are keyed by whether the runner wins or
+        loses.
+        """
+        try:
+            legs = stake_legs(arb)
+            stakes = round_stakes(legs, bet_amount, rounding)
+            if stakes is None:
+                logging.error(f"Rounding unit (${rounding}) is too large for bet amount (${bet_amount})")
+                stakes = round_stakes(legs, bet_amount, 0)
+            bets = {leg[0]: stake for leg, stake in zip(legs, stakes)}
+            returns = {leg[1]: stake * leg[4] for leg, stake in zip(legs, stakes)}
+            return sum(stake * leg[3] for leg, stake in zip(legs, stakes)), bets, returns
+        except KeyError as e:
+            logging.error(f"Missing key in arbitrage data: {str(e)}")
+            print(f"Error: Invalid arbitrage data structure. Check the logs for details.")
+            return 0, {}, {}
+
     def format_date(self, date_string):
         date = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
         return date.strftime('%Y-%m-%d %H:%M:%S %Z')
@@ -0,0 +1,263 @@
+import argparse
+import glob
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from config import Config
+from snapshot import iter_records
+
+SUMMARY_FILE = 'backtest_summary.json'
+# Upper edges, in percent, of the profit margin histogram buckets
+MARGIN_BUCKETS = (0.5, 1, 2, 3, 5, 10)
+
+# Set in each pool worker by init_worker
+analyzer = None
+
+
+class CaptureAnalyzer:
+    """
+    Runs the arbitrage engine over every odds record of saved captures.
+    Each record becomes an observation: the sport, when it was fetched,
+    how many events it held and the opportunities found in it.
+    """
+
+    def __init__(self, config):
+        # Imported here so that --help returns without loading the engine
+        from arbitrage_finder import ArbitrageFinder
+        # The finder is never closed, so the team aliases file it reads is
+        # not rewritten by every worker
+        self.finder = ArbitrageFinder(config)
+        self.engine = self.finder.arbitrage_engine
+
+    def analyze(self, path):
+        from odds_model import OddsModelBuilder
+        try:
+            mtime = os.path.getmtime(path)
+            builder = OddsModelBuilder()
+            observations = []
+            for record in iter_records(path):
+                if record.get('type') != 'odds':
+                    continue
+                odds = builder.events(record['data'])
+                opportunities = []
+                for arb in self.engine.iter_arbitrage(odds):
+                    bookmakers = tuple(sorted(set(arb['bookmakers'].values())))
+                    opportunities.append((f"{arb['event_id']}:{arb['market']}", arb['market'], bookmakers,
+                                          arb['profit_margin']))
+                observations.append({
+                    'sport': record['sport'],
+                    'fetched_at': parse_time(record.get('fetched_at'), mtime),
+                    'events': len(odds),
+                    'opportunities': opportunities,
+                })
+            return {'path': path, 'observations': observations}
+        except Exception as e:
+            return {'path': path, 'error': str(e)}
+
+
+def init_worker(config):
+    global analyzer
+    analyzer = CaptureAnalyzer(config)
+
+
+def analyze_capture(path):
+    return analyzer.analyze(path)
+
+
+def parse_time(value, default):
+    """Epoch seconds of an ISO fetch time; captures without one use default."""
+    if not value:
+        return default
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def distribution(values):
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else None,
+        'median': percentile(values, 0.5),
+        'p90': percentile(values, 0.9),
+        'p99': percentile(values, 0.99),
+        'max': values[-1] if values else None,
+    }
+
+
+class BacktestSummary:
+    """
+    Aggregates observations in fetch-time order. An opportunity is keyed by
+    event and market, like in watch mode; it lives from the first capture
+    of its sport that shows it until the first later one that does not.
+    """
+
+    def __init__(self):
+        self.captures = 0
+        self.events = 0
+        self.sightings = 0
+        self.margins = []
+        self.markets = defaultdict(int)
+        self.pairs = defaultdict(lambda: {'sightings': 0, 'opportunities': set(), 'margin_total': 0.0})
+        self.open = defaultdict(dict)  # sport -> {opportunity key: [first seen, last seen, sightings]}
+        self.lifetimes = []
+        self.single_capture = 0
+
+    def add(self, observation):
+        self.captures += 1
+        self.events += observation['events']
+        fetched_at = observation['fetched_at']
+        open_opportunities = self.open[observation['sport']]
+        seen = set()
+        for key, market, bookmakers, margin in observation['opportunities']:
+            self.sightings += 1
+            self.margins.append(margin)
+            self.markets[market] += 1
+            pair = self.pairs[bookmakers]
+            pair['sightings'] += 1
+            pair['opportunities'].add(key)
+            pair['margin_total'] += margin
+            if key in seen:
+                continue
+            seen.add(key)
+            life = open_opportunities.get(key)
+            if life is None:
+                open_opportunities[key] = [fetched_at, fetched_at, 1]
+            else:
+                life[1] = fetched_at
+                life[2] += 1
+        for key in [key for key in open_opportunities if key not in seen]:
+            self.close(open_opportunities.pop(key))
+
+    def close(self, life):
+        first_seen, last_seen, sightings = life
+        self.lifetimes.append(last_seen - first_seen)
+        if sightings == 1:
+            self.single_capture += 1
+
+    def result(self):
+        still_open = sum(len(opportunities) for opportunities in self.open.values())
+        histogram = {}
+        lower = 0
+        for upper in MARGIN_BUCKETS:
+            histogram[f'{lower}-{upper}%'] = sum(1 for margin in self.margins if lower <= margin < upper)
+            lower = upper
+        histogram[f'{lower}%+'] = sum(1 for margin in self.margins if margin >= lower)
+
+        pairs = [{
+            'bookmakers': list(bookmakers),
+            'sightings': pair['sightings'],
+            'opportunities': len(pair['opportunities']),
+            'mean_margin': pair['margin_total'] / pair['sightings'],
+        } for bookmakers, pair in self.pairs.items()]
+        pairs.sort(key=lambda pair: (-pair['sightings'], pair['bookmakers']))
+
+        return {
+            'captures': self.captures,
+            'events': self.events,
+            'opportunity_sightings': self.sightings,
+            'opportunities': len(self.lifetimes) + still_open,
+            'by_market': dict(self.markets),
+            'margin': dict(distribution(self.margins), histogram=histogram),
+            'lifetime_seconds': dict(distribution(self.lifetimes), single_capture=self.single_capture,
+                                     open_at_end=still_open),
+            'bookmaker_pairs': pairs,
+        }
+
+
+def capture_paths(directory, patterns):
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(os.path.join(directory, '**', pattern), recursive=True))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def run_backtest(paths, config, workers):
+    """Analyze the captures across a process pool and aggregate the observations."""
+    if workers <= 1:
+        captures = map(CaptureAnalyzer(config).analyze, paths)
+        return summarize(captures)
+    # Several captures per task keep the pool busy without a round trip per file
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(config,)) as executor:
+        return summarize(executor.map(analyze_capture, paths, chunksize=chunksize))
+
+
+def summarize(captures):
+    observations = []
+    failed = []
+    for capture in captures:
+        if 'error' in capture:
+            failed.append({'path': capture['path'], 'error': capture['error']})
+            continue
+        observations.extend(capture['observations'])
+    summary = BacktestSummary()
+    for observation in sorted(observations, key=lambda observation: observation['fetched_at']):
+        summary.add(observation)
+    return summary.result(), failed
+
+
+def print_summary(summary):
+    margin, lifetime = summary['margin'], summary['lifetime_seconds']
+    print(f"{summary['snapshots']} snapshots, {summary['captures']} sport captures, {summary['events']} events "
+          f"in {summary['elapsed_seconds']:.1f}s on {summary['workers']} workers")
+    if summary['failed']:
+        print(f"{len(summary['failed'])} snapshots could not be read")
+    print(f"{summary['opportunities']} opportunities seen {summary['opportunity_sightings']} times")
+    if margin['count']:
+        print(f"profit margin: median {margin['median']:.2f}%, p90 {margin['p90']:.2f}%, max {margin['max']:.2f}%")
+    if lifetime['count']:
+        print(f"lifetime: median {lifetime['median']:.0f}s, p90 {lifetime['p90']:.0f}s, max {lifetime['max']:.0f}s "
+              f"({lifetime['single_capture']} seen once, {lifetime['open_at_end']} still open at the end)")
+    for pair in summary['bookmaker_pairs'][:10]:
+        print(f"  {' / '.join(pair['bookmakers'])}: {pair['sightings']} sightings, "
+              f"{pair['opportunities']} opportunities, {pair['mean_margin']:.2f}% mean margin")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the arbitrage finder over a directory of saved captures")
+    parser.add_argument("directory", help="Directory searched recursively for --save captures, legacy JSON snapshots or snapshot archives")
+    parser.add_argument("--pattern", nargs="+", default=["*.json", "*.jsonl", "*.snap"], help="File name patterns of the captures")
+    parser.add_argument("--market", nargs="+", choices=["h2h", "spreads", "totals", "outrights", "h2h_lay", "outrights_lay"], default=["h2h"], help="Betting markets to analyze")
+    parser.add_argument("-c", "--cutoff", type=float, default=0, help="Minimum profit margin percentage")
+    parser.add_argument("--commission", type=float, help="Exchange commission on net winnings for lay markets")
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python", help="Arbitrage engine (numpy needs the numpy package)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument("--team-aliases", type=str, default="team_aliases.json", help="Team name aliases file to read")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], default="WARNING", help="Log level during the backtest")
+    parser.add_argument("--log-file", type=str, default="arbitrage_finder.log", help="Log file path")
+    parser.add_argument("--output", type=str, default=SUMMARY_FILE, help="File to write the summary to")
+    args = parser.parse_args()
+
+    paths = capture_paths(args.directory, args.pattern)
+    if not paths:
+        print(f"No captures matching {' '.join(args.pattern)} found in {args.directory}")
+        return
+    # offline_file is only set so that the finder never opens an API session
+    config = Config('us', True, args.cutoff, None, False, None, args.directory, args.market, engine=args.engine,
+                    log_level=args.log_level, log_file=args.log_file, team_aliases_file=args.team_aliases,
+                    commission=args.commission)
+    workers = max(1, min(args.workers, len(paths)))
+
+    started = time.perf_counter()
+    summary, failed = run_backtest(paths, config, workers)
+    summary = dict(snapshots=len(paths), workers=workers, elapsed_seconds=time.perf_counter() - started,
+                   markets=args.market, cutoff=args.cutoff, failed=failed, **summary)
+
+    print_summary(summary)
+    with open(args.output, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"\nBacktest summary has been written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from arbitrage_finder import ArbitrageFinder
+from config import Config
+from fast_json import find_backend
+from odds_model import OddsModelBuilder
+from snapshot import SnapshotWriter, iter_records, load_snapshot, write_archive
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+# Offline runs are started from cron many times a minute
+STARTUP_TARGET_SECONDS = 0.1
+
+BOOKMAKER_KEYS = [
+    'draftkings', 'fanduel', 'betmgm', 'williamhill_us', 'pointsbetus', 'betrivers', 'unibet_us', 'bovada',
+    'betonlineag', 'mybookieag', 'lowvig', 'betus', 'wynnbet', 'superbook', 'twinspires', 'pinnacle',
+    'betfair_ex_uk', 'matchbook', 'smarkets', 'williamhill', 'ladbrokes_uk', 'coral', 'paddypower', 'skybet',
+]
+
+
+def generate_odds(sports=5, events=100, bookmakers=10, points=3, markets=('h2h', 'spreads', 'totals'),
+                  arb_rate=0.02, seed=0):
+    """
+    Build a synthetic snapshot in the {'sports': [...], 'odds': {...}} layout,
+    with events shaped like The Odds API /odds response. Every bookmaker
+    prices each market with a 3-8% overround; about arb_rate of the quotes
+    are mispriced high enough to create arbitrage opportunities.
+    """
+    rng = random.Random(seed)
+    bookmaker_keys = [BOOKMAKER_KEYS[i % len(BOOKMAKER_KEYS)] + ('' if i < len(BOOKMAKER_KEYS) else f'_{i}')
+                      for i in range(bookmakers)]
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    data = {'sports': [], 'odds': {}}
+
+    def price(probability):
+        if rng.random() < arb_rate:
+            probability *= 0.85
+        return round(1 / (probability * rng.uniform(1.03, 1.08)), 2)
+
+    for s in range(sports):
+        sport_key = f'synthetic_sport_{s}'
+        data['sports'].append({'key': sport_key, 'group': 'Synthetic', 'title': f'Synthetic Sport {s}',
+                               'description': 'Generated by benchmark.py', 'active': True, 'has_outrights': False})
+        sport_events = []
+        for e in range(events):
+            home, away = f'Home Team {s}-{e}', f'Away Team {s}-{e}'
+            home_probability = rng.uniform(0.25, 0.75)
+            line = rng.choice([2.5, 3.5, 6.5, 7.5]) * (1 if home_probability > 0.5 else -1)
+            total = rng.choice([41.5, 44.5, 47.5])
+            event_bookmakers = []
+            for key in bookmaker_keys:
+                event_markets = []
+                if 'h2h' in markets:
+                    event_markets.append({'key': 'h2h', 'last_update': start.isoformat(), 'outcomes': [
+                        {'name': home, 'price': price(home_probability)},
+                        {'name': away, 'price': price(1 - home_probability)},
+                    ]})
+                if 'spreads' in markets:
+                    outcomes = []
+                    for p in range(points):
+                        point = line + p
+                        outcomes.append({'name': home, 'price': price(0.5), 'point': -point})
+                        outcomes.append({'name': away, 'price': price(0.5), 'point': point})
+                    event_markets.append({'key': 'spreads', 'last_update': start.isoformat(), 'outcomes': outcomes})
+                if 'totals' in markets:
+                    outcomes = []
+                    for p in range(points):
+                        outcomes.append({'name': 'Over', 'price': price(0.5), 'point': total + p})
+                        outcomes.append({'name': 'Under', 'price': price(0.5), 'point': total + p})
+                    event_markets.append({'key': 'totals', 'last_update': start.isoformat(), 'outcomes': outcomes})
+                event_bookmakers.append({'key': key, 'title': key.replace('_', ' ').title(),
+                                         'last_update': start.isoformat(), 'markets': event_markets})
+            sport_events.append({
+                'id': f'{sport_key}_{e}',
+                'sport_key': sport_key,
+                'sport_title': f'Synthetic Sport {s}',
+                'commence_time': (start + timedelta(hours=e)).isoformat().replace('+00:00', 'Z'),
+                'home_team': home,
+                'away_team': away,
+                'bookmakers': event_bookmakers,
+            })
+        data['odds'][sport_key] = sport_events
+    return data
+
+
+def measure(function, repeat):
+    """Best wall time over repeat runs, then peak traced memory of one more run."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {'seconds': min(timings), 'peak_memory_bytes': peak}
+
+
+def measure_model_memory(snapshot_path):
+    """
+    Memory held by a loaded snapshot as raw response dicts and as the
+    compact odds model, and the peak while loading each.
+    """
+    memory = {}
+    for name, convert in (('raw', None), ('compact', lambda odds: OddsModelBuilder().events(odds))):
+        tracemalloc.start()
+        data = load_snapshot(snapshot_path, convert)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del data
+        memory[name] = {'retained_bytes': retained, 'peak_bytes': peak}
+    return memory
+
+
+def measure_json_decode(snapshot_path, repeat):
+    """
+    Best time to decode every record of the snapshot with the json module
+    and with the fastest installed backend.
+    """
+    with open(snapshot_path, 'rb') as f:
+        lines = f.readlines()
+    name, fast_loads = find_backend()
+    decode = {'backend': name}
+    for label, loads in (('json', json.loads), ('fast', fast_loads)):
+        if label == 'fast' and name == 'json':
+            break
+        # Each record is dropped once decoded, as load_snapshot does after converting it
+        _, timing = measure(lambda: [loads(line) and None for line in lines], repeat)
+        decode[f'{label}_seconds'] = timing['seconds']
+    if 'fast_seconds' in decode:
+        decode['speedup'] = decode['json_seconds'] / decode['fast_seconds']
+    return decode
+
+
+def measure_startup(workdir, runs):
+    """
+    Best wall time of a bare interpreter, of main.py --help and of an offline
+    main.py run on a one-event snapshot, each started as a fresh process.
+    """
+    snapshot_path = os.path.join(workdir, 'startup_snapshot.json')
+    with open(snapshot_path, 'w') as f:
+        json.dump(generate_odds(sports=1, events=1, bookmakers=2), f)
+    commands = {
+        'interpreter': [sys.executable, '-c', 'pass'],
+        'help': [sys.executable, MAIN_SCRIPT, '--help'],
+        'offline_run': [sys.executable, MAIN_SCRIPT, '-u', '-o', snapshot_path, '--no-cache',
+                        '--log-file', os.path.join(workdir, 'startup.log'),
+                        '--team-aliases', os.path.join(workdir, 'startup_aliases.json')],
+    }
+    startup = {}
+    for name, command in commands.items():
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            timings.append(time.perf_counter() - started)
+        startup[f'{name}_seconds'] = min(timings)
+    startup['target_seconds'] = STARTUP_TARGET_SECONDS
+    return startup
+
+
+def best_odds_stage(finder, engine, odds_by_sport):
+    if engine is not finder:
+        return lambda: [engine.best_odds(odds) for odds in odds_by_sport.values()]
+
+    def run():
+        limit = finder.implied_limit()
+        for odds in odds_by_sport.values():
+            for event in odds:
+                markets = finder.viable_markets(event, finder.config.markets, limit)
+                if markets:
+                    finder.get_best_odds(event, markets)
+    return run
+
+
+def run_benchmark(args, workdir):
+    data = generate_odds(args.sports, args.events, args.bookmakers, args.points, args.markets,
+                         arb_rate=args.arb_rate, seed=args.seed)
+    # Written the way --save captures it, so loading converts one sport at a time
+    snapshot_path = os.path.join(workdir, 'snapshot.jsonl')
+    writer = SnapshotWriter(snapshot_path)
+    writer.write_sports(data['sports'])
+    for sport, odds in data['odds'].items():
+        writer.write_odds(sport, odds)
+    writer.close()
+    del data
+    archive_path = os.path.join(workdir, 'snapshot.snap')
+    write_archive(iter_records(snapshot_path), archive_path)
+    total_events = args.sports * args.events
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'sports': args.sports, 'events': args.events, 'bookmakers': args.bookmakers, 'points': args.points,
+            'markets': args.markets, 'arb_rate': args.arb_rate, 'seed': args.seed, 'repeat': args.repeat,
+        },
+        'snapshot_bytes': os.path.getsize(snapshot_path),
+        'archive_bytes': os.path.getsize(archive_path),
+        'model_memory': measure_model_memory(snapshot_path),
+        'json_decode': measure_json_decode(snapshot_path, args.repeat),
+        'engines': {},
+    }
+
+    for engine_name in args.engines:
+        config = Config('us', True, 0, None, False, None, snapshot_path, args.markets, engine=engine_name,
+                        log_level=args.log_level, log_file=os.path.join(workdir, 'benchmark.log'))
+        finder = ArbitrageFinder(config)
+        engine = finder.arbitrage_engine
+        if engine_name == 'numpy' and engine is finder:
+            print("Skipping numpy engine: numpy is not installed.")
+            continue
+
+        stages = {}
+        data, stages['load'] = measure(lambda: load_snapshot(snapshot_path, OddsModelBuilder().events), args.repeat)
+        odds_by_sport = data['odds']
+        _, stages['best_odds'] = measure(best_odds_stage(finder, engine, odds_by_sport), args.repeat)
+        arbs, stages['arbitrage'] = measure(
+            lambda: [arb for odds in odds_by_sport.values() for arb in engine.calculate_arbitrage(odds)], args.repeat)
+        results = {'total_events': total_events, 'total_arbitrage_opportunities': len(arbs),
+                   'markets': args.markets, 'arbitrage_opportunities': arbs, 'api_usage': None}
+        output_path = os.path.join(workdir, 'arbitrage_results.json')
+
+        def write_output():
+            with open(output_path, 'w') as f:
+                json.dump(results, f, indent=2)
+        _, stages['output'] = measure(write_output, args.repeat)
+
+        for name in ('best_odds', 'arbitrage'):
+            stages[name]['events_per_second'] = total_events / stages[name]['seconds'] if stages[name]['seconds'] else None
+        finder.close()
+        report['engines'][engine_name] = {'opportunities': len(arbs), 'stages': stages}
+
+    if args.startup_runs > 0:
+        report['startup'] = measure_startup(workdir, args.startup_runs)
+    return report
+
+
+def print_report(report):
+    parameters = report['parameters']
+    print(f"{parameters['sports']} sports x {parameters['events']} events x {parameters['bookmakers']} bookmakers, "
+          f"markets {', '.join(parameters['markets'])}, snapshot {report['snapshot_bytes'] / 1e6:.1f} MB "
+          f"({report['archive_bytes'] / 1e6:.2f} MB as an archive)")
+    raw, compact = report['model_memory']['raw'], report['model_memory']['compact']
+    print(f"odds in memory: {raw['retained_bytes'] / 1e6:.1f} MB as response dicts, "
+          f"{compact['retained_bytes'] / 1e6:.1f} MB as the compact model "
+          f"({raw['retained_bytes'] / max(compact['retained_bytes'], 1):.1f}x smaller); "
+          f"peak while loading {raw['peak_bytes'] / 1e6:.1f} MB vs {compact['peak_bytes'] / 1e6:.1f} MB")
+    decode = report['json_decode']
+    if 'fast_seconds' in decode:
+        print(f"JSON decoding: {decode['json_seconds'] * 1000:.1f} ms with json, "
+              f"{decode['fast_seconds'] * 1000:.1f} ms with {decode['backend']} ({decode['speedup']:.1f}x)")
+    else:
+        print(f"JSON decoding: {decode['json_seconds'] * 1000:.1f} ms with json (install orjson or msgspec to compare)")
+    for engine_name, result in report['engines'].items():
+        print(f"\n{engine_name} engine ({result['opportunities']} opportunities)")
+        for stage, numbers in result['stages'].items():
+            rate = numbers.get('events_per_second')
+            rate_text = f"{rate:12,.0f} events/s" if rate else " " * 21
+            print(f"  {stage:<10} {numbers['seconds'] * 1000:10.1f} ms {rate_text} "
+                  f"{numbers['peak_memory_bytes'] / 1e6:10.1f} MB peak")
+
+    startup = report.get('startup')
+    if startup:
+        offline = startup['offline_run_seconds']
+        verdict = "within" if offline <= startup['target_seconds'] else "over"
+        print(f"\nstartup (bare interpreter {startup['interpreter_seconds'] * 1000:.1f} ms)")
+        print(f"  --help     {startup['help_seconds'] * 1000:10.1f} ms")
+        print(f"  offline    {offline * 1000:10.1f} ms ({verdict} the {startup['target_seconds'] * 1000:.0f} ms target)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the arbitrage engines on synthetic odds")
+    parser.add_argument("--sports", type=int, default=5, help="Number of sports to generate")
+    parser.add_argument("--events", type=int, default=200, help="Events per sport")
+    parser.add_argument("--bookmakers", type=int, default=10, help="Bookmakers per event")
+    parser.add_argument("--points", type=int, default=3, help="Spread and total points per bookmaker")
+    parser.add_argument("--markets", nargs="+", choices=["h2h", "spreads", "totals"], default=["h2h", "spreads", "totals"], help="Markets to generate and analyze")
+    parser.add_argument("--arb-rate", type=float, default=0.02, help="Share of mispriced quotes")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generator")
+    parser.add_argument("--engines", nargs="+", choices=["python", "numpy"], default=["python", "numpy"], help="Engines to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is reported")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Process starts per startup measurement; 0 skips it")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], default="WARNING", help="Log level during the benchmark")
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="File to write the machine-readable results to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report = run_benchmark(args, workdir)
+
+    print_report(report)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBenchmark results have been written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,61 @@
+# Lay markets are compared against the back prices of their base market,
+# so requesting one also requests the other.
+LAY_MARKETS = {'h2h_lay': 'h2h', 'outrights_lay': 'outrights'}
+OUTRIGHT_MARKETS = ('outrights', 'outrights_lay')
+
+# Commission charged on net winnings by betting exchanges, by bookmaker key
+EXCHANGE_COMMISSIONS = {
+    'betfair_ex_uk': 0.05,
+    'betfair_ex_eu': 0.05,
+    'betfair_ex_au': 0.05,
+    'matchbook': 0.02,
+    'smarkets': 0.02,
+}
+
+
 class Config:
-    def __init__(self, region, unformatted, cutoff, api_key, interactive, save_file, offline_file, market):
-        self.region = region
+    def __init__(self, regions, unformatted, cutoff, api_key, interactive, save_file, offline_file, markets,
+                 concurrency=8, engine='python', cache_dir=None, refresh=False, sports_ttl=86400, odds_ttl=30,
+                 log_level='INFO', log_file='arbitrage_finder.log', log_queue=False,
+                 team_aliases_file=None, commission=None, sinks=None, stream_only=False,
+                 bankroll=None, balances_file=None, stake_unit=1, metrics_port=None):
+        # A single region name is accepted for backwards compatibility
+        self.regions = [regions] if isinstance(regions, str) else list(regions)
         self.unformatted = unformatted
         self.cutoff = cutoff
         self.api_key = api_key
         self.interactive = interactive
         self.save_file = save_file
         self.offline_file = offline_file
-        self.market = market
-
-
-
+        # A single market name is accepted for backwards compatibility
+        self.markets = [markets] if isinstance(markets, str) else list(markets)
+        self.api_markets = list(dict.fromkeys(
+            key for market in self.markets for key in (LAY_MARKETS.get(market), market) if key))
+        self.concurrency = concurrency
+        self.engine = engine
+        self.cache_dir = cache_dir
+        self.refresh = refresh
+        self.sports_ttl = sports_ttl
+        self.odds_ttl = odds_ttl
+        self.log_level = log_level
+        self.log_file = log_file
+        self.log_queue = log_queue
+        self.team_aliases_file = team_aliases_file
+        # Overrides EXCHANGE_COMMISSIONS for every exchange when set
+        self.commission = commission
+        # Result sink specs (see sinks.create_sink); with stream_only the
+        # opportunities are only sent to the sinks, not kept for the results file
+        self.sinks = list(sinks or [])
+        self.stream_only = stream_only
+        # With a bankroll, stakes for every opportunity are computed in one
+        # batch (see stakes.StakeAllocator) and written alongside each arb
+        self.bankroll = bankroll
+        self.balances_file = balances_file
+        self.stake_unit = stake_unit
+        # Serve metrics in the Prometheus text format on this local port
+        self.metrics_port = metrics_port
 
+    def exchange_commission(self, bookmaker_key):
+        if bookmaker_key not in EXCHANGE_COMMISSIONS:
+            return 0.0
+        return EXCHANGE_COMMISSIONS[bookmaker_key] if self.commission is None else self.commission
@@ -1,7 +1,7 @@
-import subprocess
 import sys
-import time
 import signal
+from main import parse_args, run
+from viewer import serve_results
 
 def get_user_input(prompt, choices=None):
     while True:
@@ -21,7 +21,13 @@ def main():
     print("Let's configure your run:")
 
     # Region
-    region = get_user_input("Choose a region (eu/us/uk/au) [default: us]: ", ["", "eu", "us", "uk", "au"]) or "us"
+    while True:
+        region_choice = get_user_input("Choose one or more regions (eu/us/uk/au, comma-separated) [default: us]: ") or "us"
+        regions = [region.strip() for region in region_choice.split(",")]
+        if all(region in ["eu", "us", "uk", "au"] for region in regions):
+            break
+        print("Invalid input. Please try again.")
+    regions = list(dict.fromkeys(regions))
 
     # Betting Market
     market_options = {
@@ -32,11 +38,16 @@ def main():
         "5": "h2h_lay",
         "6": "outrights_lay"
     }
-    print("\nChoose a betting market:")
+    print("\nChoose one or more betting markets:")
     for key, value in market_options.items():
         print(f"{key}. {value}")
-    market_choice = get_user_input("Enter your choice (1-6) [default: 1]: ", ["", "1", "2", "3", "4", "5", "6"]) or "1"
-    market = market_options[market_choice]
+    while True:
+        market_choice = get_user_input("Enter your choices (1-6, comma-separated) [default: 1]: ") or "1"
+        choices = [choice.strip() for choice in market_choice.split(",")]
+        if all(choice in market_options for choice in choices):
+            break
+        print("Invalid input. Please try again.")
+    markets = [market_options[choice] for choice in dict.fromkeys(choices)]
 
     # Cutoff
     cutoff = get_user_input("Enter minimum profit margin percentage [default: 0]: ") or "0"
@@ -48,39 +59,30 @@ def main():
     # Offline mode
     offline = get_user_input("Use offline data? (y/n) [default: n]: ", ["", "y", "n", "Y", "N"]) or "n"
     if offline.lower() == "y":
-        offline_file = get_user_input("Enter the name of the offline data file [default: response_data.json]: ") or "response_data.json"
+        offline_file = get_user_input("Enter the name of the offline data file [default: response_data.jsonl]: ") or "response_data.jsonl"
     else:
         offline_file = None
 
-    # Build the command
-    command = [sys.executable, "main.py", "-r", region, "-c", cutoff, "-s", "response_data.json", "--market", market]
+    # Build the same arguments main.py would get
+    argv = ["-r", *regions, "-c", cutoff, "-s", "response_data.jsonl", "--market", *markets]
     if interactive:
-        command.append("-i")
+        argv.append("-i")
     if offline_file:
-        command.extend(["-o", offline_file])
+        argv.extend(["-o", offline_file])
 
-    # Run the command
+    # Run the finder and hand its results straight to the viewer
     print("\nRunning the arbitrage finder...")
     try:
-        subprocess.run(command, check=True)
-    except subprocess.CalledProcessError:
-        print("An error occurred while running the arbitrage finder.")
-        return
+        results = run(parse_args(argv))
     except KeyboardInterrupt:
         print("\nArbitrage finder interrupted. Exiting.")
         return
+    except Exception as e:
+        print(f"An error occurred while running the arbitrage finder: {e}")
+        return
 
-    # Wait for a moment to ensure the JSON file is written
-    time.sleep(2)
-
-    # Run the viewer
     print("\nLaunching the arbitrage opportunities viewer...")
-    try:
-        subprocess.run([sys.executable, "viewer.py"], check=True)
-    except subprocess.CalledProcessError:
-        print("An error occurred while running the viewer.")
-    except KeyboardInterrupt:
-        print("\nViewer interrupted. Exiting.")
+    serve_results(results)
 
 if __name__ == "__main__":
     main()
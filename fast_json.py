@@ -0,0 +1,50 @@
+import json
+
+# Bodies smaller than this are decoded with the json module: importing a
+# faster backend takes longer than it would save on them
+FAST_MIN_BYTES = 256 * 1024
+
+# Set on the first large body by loads
+backend = None
+fast_loads = None
+
+
+def find_backend():
+    """
+    The fastest installed JSON decoder as (name, loads): orjson, then
+    msgspec, then the json module. Each returns plain dicts and lists.
+    """
+    try:
+        import orjson
+        return 'orjson', orjson.loads
+    except ImportError:
+        pass
+    try:
+        import msgspec
+    except ImportError:
+        return 'json', json.loads
+    decoder = msgspec.json.Decoder()
+
+    def msgspec_loads(data):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return 'msgspec', msgspec_loads
+
+
+def loads(data):
+    """
+    Decode JSON text or bytes. Large bodies go to the fastest installed
+    backend; anything it rejects is retried with the json module, so the
+    same documents are accepted either way (NaN, very large integers).
+    """
+    global backend, fast_loads
+    if len(data) < FAST_MIN_BYTES:
+        return json.loads(data)
+    if fast_loads is None:
+        backend, fast_loads = find_backend()
+    try:
+        return fast_loads(data)
+    except ValueError:
+        return json.loads(data)
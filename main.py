@@ -1,36 +1,101 @@
 import argparse
-import json
-from arbitrage_finder import ArbitrageFinder
+import sys
 from config import Config
+from regions import REGIONS
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(description="Sports Betting Arbitrage Finder")
-    parser.add_argument("-r", "--region", choices=["eu", "us", "uk", "au"], default="us", help="Region for bookmakers")
+    parser.add_argument("-r", "--region", nargs="+", choices=REGIONS, default=["us"], help="Regions for bookmakers, fetched together in one request per sport")
     parser.add_argument("-u", "--unformatted", action="store_true", help="Skip interactive UI and only output JSON data")
     parser.add_argument("-c", "--cutoff", type=float, default=0, help="Minimum profit margin percentage")
     parser.add_argument("--api-key", type=str, help="API key for The Odds API")
     parser.add_argument("-i", "--interactive", action="store_true", help="Enable interactive betting calculator")
     parser.add_argument("-s", "--save", type=str, help="Save API response to a file")
     parser.add_argument("-o", "--offline", type=str, help="Use offline data from a file instead of making API calls")
-    parser.add_argument("--market", choices=["h2h", "spreads", "totals", "outrights", "h2h_lay", "outrights_lay"], default="h2h", help="Betting market to analyze")
-    args = parser.parse_args()
+    parser.add_argument("--market", nargs="+", choices=["h2h", "spreads", "totals", "outrights", "h2h_lay", "outrights_lay"], default=["h2h"], help="Betting markets to analyze in a single pass")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum number of sports to fetch at once")
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python", help="Arbitrage engine (numpy needs the numpy package)")
+    parser.add_argument("-w", "--watch", type=float, metavar="SECONDS", help="Keep running and poll for changed opportunities every SECONDS")
+    parser.add_argument("--min-remaining", type=int, default=0, help="API requests to keep in reserve; watch mode stops before going below this")
+    parser.add_argument("--max-interval", type=float, default=1800, help="Longest time in seconds between polls of a quiet sport in watch mode")
+    parser.add_argument("--budget-horizon", type=float, metavar="HOURS", help="Spread the remaining requests over this many hours in watch mode (default: until the monthly quota reset)")
+    parser.add_argument("--cache-dir", type=str, default=".odds_cache", help="Directory for cached API responses")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write cached API responses")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached responses and fetch fresh data (the cache is still updated)")
+    parser.add_argument("--sports-ttl", type=float, default=86400, help="Seconds a cached sports list stays valid")
+    parser.add_argument("--odds-ttl", type=float, default=30, help="Seconds cached odds stay valid")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], default="INFO", help="Minimum level written to the log file")
+    parser.add_argument("--log-file", type=str, default="arbitrage_finder.log", help="Log file path")
+    parser.add_argument("--log-queue", action="store_true", help="Write the log file from a background thread")
+    parser.add_argument("--team-aliases", type=str, default="team_aliases.json", help="File where learned team name aliases are kept between runs")
+    parser.add_argument("--commission", type=float, help="Exchange commission on net winnings (e.g. 0.02) for lay markets, overriding the built-in per-exchange rates")
+    parser.add_argument("--sink", action="append", metavar="SPEC", help="Stream each opportunity as a JSON line as soon as it is found: a file or named pipe path, '-' for stdout, tcp://host:port or unix:///path (repeatable)")
+    parser.add_argument("--stream-only", action="store_true", help="Only send opportunities to the sinks; do not keep them in memory or write arbitrage_results.json")
+    parser.add_argument("--bankroll", type=float, help="Stake this bankroll on the best opportunities first and write rounded stakes alongside each one; without --balances the best one usually takes it all")
+    parser.add_argument("--balances", type=str, metavar="FILE", help="JSON file of available balance per bookmaker title, limiting --bankroll stakes")
+    parser.add_argument("--stake-unit", type=float, default=1, help="Round --bankroll stakes to whole multiples of this amount (0 for no rounding)")
+    parser.add_argument("--metrics-port", type=int, help="Serve run metrics in the Prometheus text format at http://127.0.0.1:PORT/metrics")
+    return parser
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.stream_only and not args.sink:
+        parser.error("--stream-only needs at least one --sink")
+    if args.bankroll and args.stream_only:
+        parser.error("--bankroll needs the opportunities kept in memory and cannot be used with --stream-only")
+    if args.save:
+        from snapshot import appendable
+        if not appendable(args.save):
+            parser.error(f"--save {args.save} is a legacy snapshot or an archive, not a JSON Lines capture; "
+                         "appending to it would make it unreadable, so choose a new file")
+    return args
 
-    config = Config(args.region, args.unformatted, args.cutoff, args.api_key, args.interactive, args.save, args.offline, args.market)
-    arbitrage_finder = ArbitrageFinder(config)
-    results = arbitrage_finder.find_arbitrage()
+def config_from_args(args):
+    return Config(args.region, args.unformatted, args.cutoff, args.api_key, args.interactive, args.save, args.offline, args.market,
+                  concurrency=args.concurrency, engine=args.engine,
+                  cache_dir=None if args.no_cache else args.cache_dir, refresh=args.refresh,
+                  sports_ttl=args.sports_ttl, odds_ttl=args.odds_ttl,
+                  log_level=args.log_level, log_file=args.log_file, log_queue=args.log_queue,
+                  team_aliases_file=args.team_aliases, commission=args.commission,
+                  sinks=args.sink, stream_only=args.stream_only,
+                  bankroll=args.bankroll, balances_file=args.balances, stake_unit=args.stake_unit,
+                  metrics_port=args.metrics_port)
 
-    # Always write results to arbitrage_results.json
-    with open('arbitrage_results.json', 'w') as f:
-        json.dump(results, f, indent=2)
-    print(f"Results have been written to arbitrage_results.json")
-    print(f"Detailed logs can be found in arbitrage_finder.log")
+def run(args):
+    """Run the finder for parsed command-line args and write the results file."""
+    # Imported here so that --help and argument errors return without
+    # loading the finder and its dependencies
+    from pipeline import RESULTS_FILE, find_opportunities, save_results
+    config = config_from_args(args)
+    budget_horizon = args.budget_horizon * 3600 if args.budget_horizon else None
+    results = find_opportunities(config, watch=args.watch, min_remaining=args.min_remaining,
+                                 max_interval=args.max_interval, budget_horizon=budget_horizon)
+
+    # Keep stdout clean for the JSON lines when streaming to it
+    status = sys.stderr if any(spec in ('-', 'stdout') for spec in config.sinks) else sys.stdout
+    if config.stream_only:
+        print(f"Streamed {results['total_arbitrage_opportunities']} opportunities to {', '.join(config.sinks)}", file=status)
+    else:
+        save_results(results)
+        print(f"Results have been written to {RESULTS_FILE}", file=status)
+    if results.get('stakes'):
+        stakes = results['stakes']
+        print(f"Staked {stakes['allocated']:.2f} of {stakes['bankroll']:.2f} over {stakes['funded_opportunities']} opportunities "
+              f"for a guaranteed profit of {stakes['guaranteed_profit']:.2f}", file=status)
+    print(f"Detailed logs can be found in {config.log_file}", file=status)
 
     if not config.unformatted:
         # Display interactive UI or other formatted output here
-        print("Displaying interactive UI or formatted output...")
+        print("Displaying interactive UI or formatted output...", file=status)
         # You can add more code here to handle the interactive UI
     else:
-        print("Skipping interactive UI due to -u flag.")
+        print("Skipping interactive UI due to -u flag.", file=status)
+
+    return results
+
+def main():
+    run(parse_args())
 
 if __name__ == "__main__":
     main()
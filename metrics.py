@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_PREFIX = 'arbfinder'
+
+
+class Metrics:
+    """
+    Stage timers, counters and a request latency histogram for a finder.
+
+    Stages are summed across threads, so with concurrent fetches 'fetch'
+    can exceed the wall time. Everything is cumulative over the finder's
+    life; a watch run reports the totals of all polls so far.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = defaultdict(float)  # stage -> seconds
+        self.counters = defaultdict(int)  # name -> count
+        self.sports = defaultdict(lambda: defaultdict(int))  # sport -> stage or counter -> value
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.requests = 0
+
+    def add_time(self, stage, seconds, sport=None):
+        with self.lock:
+            self.stages[stage] += seconds
+            if sport is not None:
+                self.sports[sport][f'{stage}_seconds'] += seconds
+
+    @contextmanager
+    def timer(self, stage, sport=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started, sport)
+
+    def count(self, name, value=1, sport=None):
+        with self.lock:
+            self.counters[name] += value
+            if sport is not None:
+                self.sports[sport][name] += value
+
+    def observe_request(self, seconds, size, sport=None):
+        """Record one API response: its latency and body size in bytes."""
+        with self.lock:
+            self.requests += 1
+            self.latency_sum += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.latency_buckets[index] += 1
+                    break
+            self.counters['downloaded_bytes'] += size
+            self.stages['fetch'] += seconds
+            if sport is not None:
+                self.sports[sport]['fetch_seconds'] += seconds
+                self.sports[sport]['downloaded_bytes'] += size
+
+    def snapshot(self):
+        """A JSON-friendly copy of the metrics, as put in the results."""
+        with self.lock:
+            counters = dict(self.counters)
+            stages = dict(self.stages)
+            sports = {sport: dict(values) for sport, values in self.sports.items()}
+            buckets = list(self.latency_buckets)
+            requests, latency_sum = self.requests, self.latency_sum
+
+        cumulative = {}
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS, buckets):
+            total += count
+            cumulative[str(bound)] = total
+        cumulative['+Inf'] = requests
+        downloaded = counters.pop('downloaded_bytes', 0)
+        hits, misses = counters.pop('cache_hits', 0), counters.pop('cache_misses', 0)
+        analyze = stages.get('analyze')
+        return {
+            'uptime_seconds': time.time() - self.started,
+            'stages': stages,
+            'requests': {
+                'count': requests,
+                'downloaded_bytes': downloaded,
+                'latency_seconds': {
+                    'sum': latency_sum,
+                    'mean': latency_sum / requests if requests else None,
+                    'buckets': cumulative,
+                },
+            },
+            'cache': {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses)} if hits + misses else None,
+            'events_per_second': counters.get('events', 0) / analyze if analyze else None,
+            'counters': counters,
+            'sports': sports,
+        }
+
+    def prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        data = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            name = f'{PROMETHEUS_PREFIX}_{name}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+                lines.append(f'{name}{suffix}{{{label_text}}} {value}' if label_text else f'{name}{suffix} {value}')
+
+        metric('stage_seconds_total', 'counter', 'Time spent in each stage, summed across threads.',
+               [('', {'stage': stage}, seconds) for stage, seconds in sorted(data['stages'].items())])
+        latency = data['requests']['latency_seconds']
+        metric('request_duration_seconds', 'histogram', 'Latency of API requests.',
+               [('_bucket', {'le': bound}, count) for bound, count in latency['buckets'].items()] +
+               [('_sum', {}, latency['sum']), ('_count', {}, data['requests']['count'])])
+        metric('downloaded_bytes_total', 'counter', 'Bytes of API response bodies downloaded.',
+               [('', {}, data['requests']['downloaded_bytes'])])
+        if data['cache']:
+            metric('cache_lookups_total', 'counter', 'Response cache lookups by result.',
+                   [('', {'result': 'hit'}, data['cache']['hits']), ('', {'result': 'miss'}, data['cache']['misses'])])
+        for name, value in sorted(data['counters'].items()):
+            metric(f'{name}_total', 'counter', f'Count of {name.replace("_", " ")}.', [('', {}, value)])
+        sport_samples = defaultdict(list)
+        for sport, values in sorted(data['sports'].items()):
+            for name, value in sorted(values.items()):
+                sport_samples[name].append(('', {'sport': sport}, value))
+        for name, samples in sorted(sport_samples.items()):
+            metric(f'sport_{name}_total', 'counter', f'Per-sport {name.replace("_", " ")}.', samples)
+        metric('uptime_seconds', 'gauge', 'Seconds since the finder started.', [('', {}, data['uptime_seconds'])])
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def serve_metrics(metrics, port, host='127.0.0.1'):
+    """
+    Serve metrics.prometheus() at http://host:port/metrics from a daemon
+    thread. Returns the server; call shutdown() on it to stop.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
@@ -1,19 +1,88 @@
-import requests
 import os
-import json
-from dotenv import load_dotenv
+import threading
+import time
+from config import OUTRIGHT_MARKETS
+from fast_json import loads
+from metrics import Metrics
+from odds_model import OddsModelBuilder
+from snapshot import SnapshotWriter, load_snapshot
+
+# requests, dotenv and the thread pool are imported where they are first
+# used, so offline runs never pay for loading them.
 
 class OddsAPI:
-    def __init__(self, config):
-        load_dotenv()
-        self.api_key = config.api_key or os.getenv('ODDS_API_KEY')
+    def __init__(self, config, metrics=None):
+        self.api_key = config.api_key or self.env_api_key(config)
         self.base_url = 'https://api.the-odds-api.com/v4'
         self.config = config
+        self.metrics = metrics or Metrics()
         self.remaining_requests = None
         self.used_requests = None
+        # When the response that set the usage counts above was received
+        self.usage_received_at = None
         self.api_limit_reached = False
+        self.last_error_status = None
+        self.offline_data = None
+        self.outright_sports = set()
+        # Odds are handed out as compact odds_model Events, not raw response dicts
+        self.model = OddsModelBuilder()
+        self.snapshot_writer = SnapshotWriter(config.save_file) if config.save_file else None
+        self.lock = threading.Lock()
+        self.session = None if config.offline_file else self.create_session()
+        self.cache = self.create_cache()
+        # Watch mode turns this off, since it needs fresh odds on every poll
+        self.read_odds_cache = True
+
+    def env_api_key(self, config):
+        if config.offline_file:
+            return None
+        from dotenv import load_dotenv
+        load_dotenv()
+        return os.getenv('ODDS_API_KEY')
+
+    def create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        # One keep-alive pool shared by every request, sized so that each
+        # concurrent worker can hold its own connection to the API host.
+        pool_size = max(1, self.config.concurrency)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def create_cache(self):
+        if not self.config.cache_dir or self.config.offline_file:
+            return None
+        from response_cache import ResponseCache
+        ttls = {'sports': self.config.sports_ttl, 'odds': self.config.odds_ttl}
+        return ResponseCache(self.config.cache_dir, ttls)
+
+    def cached(self, endpoint, url, params):
+        # A --save capture records only responses fetched when it was
+        # written, so that backtest lifetimes are not stretched by cache hits
+        if self.cache is None or self.config.refresh or self.snapshot_writer:
+            return None
+        if endpoint == 'odds' and not self.read_odds_cache:
+            return None
+        data = self.cache.get(endpoint, url, params)
+        self.metrics.count('cache_hits' if data is not None else 'cache_misses')
+        return data
+
+    def close(self):
+        if self.session:
+            self.session.close()
+        if self.snapshot_writer:
+            self.snapshot_writer.close()
 
     def get_sports(self):
+        sports_data = self.fetch_sports()
+        self.outright_sports = {sport['key'] for sport in sports_data or [] if sport.get('has_outrights')}
+        return sports_data
+
+    def fetch_sports(self):
         if self.config.offline_file:
             return self.load_offline_data()['sports']
         
@@ -22,12 +91,19 @@ class OddsAPI:
             'api_key': self.api_key,
             'all': 'false'
         }
+        sports_data = self.cached('sports', url, params)
+        if sports_data is not None:
+            return sports_data
+        import requests
         try:
-            response = requests.get(url, params=params)
+            response = self.request(url, params)
             response.raise_for_status()
-            sports_data = response.json()
-            if self.config.save_file:
-                self.save_data({'sports': sports_data, 'odds': {}})
+            with self.metrics.timer('decode'):
+                sports_data = loads(response.content)
+            if self.cache is not None:
+                self.cache.put('sports', url, params, sports_data)
+            if self.snapshot_writer:
+                self.snapshot_writer.write_sports(sports_data)
             return sports_data
         except requests.RequestException as e:
             self.handle_api_error(e)
@@ -40,58 +116,138 @@ class OddsAPI:
         if self.api_limit_reached:
             return []
 
+        markets = self.markets_for_sport(sport)
+        if not markets:
+            return []
+
         url = f"{self.base_url}/sports/{sport}/odds"
         params = {
             'api_key': self.api_key,
-            'regions': self.config.region,
-            'markets': self.config.market,  # Use the new market parameter
+            'regions': ','.join(self.config.regions),
+            'markets': ','.join(markets),
             'oddsFormat': 'decimal',
             'dateFormat': 'iso'
         }
+        odds_data = self.cached('odds', url, params)
+        if odds_data is not None:
+            return self.convert(sport, odds_data)
+        import requests
         try:
-            response = requests.get(url, params=params)
+            sent_at = time.monotonic()
+            response = self.request(url, params, sport)
             if response.status_code == 422:
                 return []
             response.raise_for_status()
             
-            self.remaining_requests = response.headers.get('x-requests-remaining')
-            self.used_requests = response.headers.get('x-requests-used')
+            self.update_usage(response.headers, sent_at)
             
-            odds_data = response.json()
-            if self.config.save_file:
-                self.save_data_for_sport(sport, odds_data)
-            return odds_data
+            with self.metrics.timer('decode', sport):
+                odds_data = loads(response.content)
+            if self.cache is not None:
+                self.cache.put('odds', url, params, odds_data)
+            if self.snapshot_writer:
+                self.snapshot_writer.write_odds(sport, odds_data)
+            return self.convert(sport, odds_data)
         except requests.RequestException as e:
             self.handle_api_error(e)
             return []
 
+    def request(self, url, params, sport=None):
+        started = time.perf_counter()
+        response = self.session.get(url, params=params)
+        # The body has been read by now, so this covers the whole download
+        self.metrics.observe_request(time.perf_counter() - started, len(response.content), sport)
+        return response
+
+    def convert(self, sport, odds_data):
+        with self.metrics.timer('convert', sport):
+            return self.model.events(odds_data)
+
+    def markets_for_sport(self, sport):
+        # Outright markets only exist for futures sports and game markets only
+        # for the others, so ask each sport just for the ones it can have.
+        is_outright = sport in self.outright_sports
+        return [market for market in self.config.api_markets if (market in OUTRIGHT_MARKETS) == is_outright]
+
+    def get_all_odds(self, sports):
+        """
+        Fetch odds for several sports at once over the shared session.
+        Yields (sport key, odds) pairs as each sport's response arrives, so
+        callers can analyze and drop a sport while the others download.
+        """
+        if self.config.offline_file or self.config.concurrency <= 1:
+            for sport in sports:
+                yield sport, self.get_odds(sport)
+            return
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        with ThreadPoolExecutor(max_workers=self.config.concurrency) as executor:
+            pending = {executor.submit(self.get_odds, sport): sport for sport in sports}
+            try:
+                for future in as_completed(pending):
+                    # Drop our reference so the odds are freed once analyzed
+                    yield pending.pop(future), future.result()
+            finally:
+                # Stop queued fetches if the caller gave up early
+                for future in pending:
+                    future.cancel()
+
+    def update_usage(self, headers, sent_at=None):
+        # Concurrent responses can complete out of order, so a response only
+        # replaces the counts if it used more requests, or if it was sent after
+        # the counts were received and so must be newer. The latter lets the
+        # counts go back down after the monthly quota resets.
+        remaining = headers.get('x-requests-remaining')
+        used = headers.get('x-requests-used')
+        if remaining is None and used is None:
+            return
+        with self.lock:
+            newer = (self.usage_received_at is None or sent_at is None or sent_at >= self.usage_received_at)
+            if used is not None and self.used_requests is not None:
+                newer = newer or float(used) > float(self.used_requests)
+            elif remaining is not None and self.remaining_requests is not None:
+                newer = newer or float(remaining) < float(self.remaining_requests)
+            if not newer:
+                return
+            if remaining is not None:
+                self.remaining_requests = remaining
+            if used is not None:
+                self.used_requests = used
+            self.usage_received_at = time.monotonic()
+
     def handle_api_error(self, error):
+        import requests
         if isinstance(error, requests.exceptions.HTTPError):
+            self.last_error_status = error.response.status_code
             if error.response.status_code == 401:
-                print("Error: Unauthorized. Please check your API key.")
-                self.api_limit_reached = True
+                if self.set_limit_reached():
+                    print("Error: Unauthorized. Please check your API key.")
             elif error.response.status_code == 429:
-                print("Error: API request limit reached. Please try again later or upgrade your plan.")
-                self.api_limit_reached = True
+                if self.set_limit_reached():
+                    print("Error: API request limit reached. Please try again later or upgrade your plan.")
             else:
                 print(f"HTTP Error: {error}")
         else:
             print(f"Error fetching data: {error}")
 
-    def save_data(self, data):
-        with open(self.config.save_file, 'w') as f:
-            json.dump(data, f)
+    def set_limit_reached(self):
+        # Returns True only for the request that first hit the limit, so
+        # concurrent failures report it once.
+        with self.lock:
+            first = not self.api_limit_reached
+            self.api_limit_reached = True
+            return first
 
-    def save_data_for_sport(self, sport, odds_data):
-        if os.path.exists(self.config.save_file):
-            with open(self.config.save_file, 'r') as f:
-                data = json.load(f)
-        else:
-            data = {'sports': [], 'odds': {}}
-        
-        data['odds'][sport] = odds_data
-        self.save_data(data)
+    def clear_limit_reached(self):
+        with self.lock:
+            self.api_limit_reached = False
+            self.last_error_status = None
 
     def load_offline_data(self):
-        with open(self.config.offline_file, 'r') as f:
-            return json.load(f)
+        # The snapshot is parsed on first use and shared by get_sports and
+        # every get_odds call, which are then plain dict lookups.
+        with self.lock:
+            if self.offline_data is None:
+                with self.metrics.timer('load'):
+                    self.offline_data = load_snapshot(self.config.offline_file, self.model.events)
+            return self.offline_data
@@ -0,0 +1,111 @@
+import sys
+
+
+class Bookmaker:
+    __slots__ = ('key', 'title')
+
+    def __init__(self, key, title):
+        self.key = key
+        self.title = title
+
+
+class MarketQuotes:
+    """
+    One market's quotes for an event, stored as parallel columns in the
+    order the bookmakers listed them. Iterating yields
+    (bookmaker, name, price, point) tuples; point is None when the market
+    has no line.
+    """
+
+    __slots__ = ('bookmakers', 'names', 'prices', 'points')
+
+    def __init__(self):
+        self.bookmakers = []
+        self.names = []
+        self.prices = []
+        self.points = []
+
+    def append(self, bookmaker, name, price, point):
+        self.bookmakers.append(bookmaker)
+        self.names.append(name)
+        self.prices.append(price)
+        self.points.append(point)
+
+    def __iter__(self):
+        return zip(self.bookmakers, self.names, self.prices, self.points)
+
+    def __len__(self):
+        return len(self.prices)
+
+
+class Event:
+    """
+    Compact form of one event from an /odds response. markets maps each
+    API market key to its MarketQuotes; bookmakers lists the event's
+    bookmakers in response order.
+    """
+
+    __slots__ = ('id', 'sport_key', 'sport_title', 'commence_time', 'home_team', 'away_team',
+                 'bookmakers', 'markets')
+
+    def __init__(self, id, sport_key, sport_title, commence_time, home_team, away_team, bookmakers, markets):
+        self.id = id
+        self.sport_key = sport_key
+        self.sport_title = sport_title
+        self.commence_time = commence_time
+        self.home_team = home_team
+        self.away_team = away_team
+        self.bookmakers = bookmakers
+        self.markets = markets
+
+
+class OddsModelBuilder:
+    """
+    Turns /odds response data into Events. Bookmakers, names, prices and
+    points seen before are shared rather than stored again, so a sweep
+    holds a single copy of each bookmaker, team, price and line.
+    """
+
+    def __init__(self):
+        self.bookmakers = {}  # (key, title) -> Bookmaker
+        # Only floats are shared: keying ints here would turn 2 into an equal 2.0
+        self.floats = {}
+
+    def events(self, odds_data):
+        return [self.event(data) for data in odds_data or []]
+
+    def event(self, data):
+        bookmakers = []
+        markets = {}
+        intern = sys.intern
+        share_float = self.floats.setdefault
+        if isinstance(data.get('bookmakers'), list):
+            for bookmaker_data in data['bookmakers']:
+                bookmaker = self.bookmaker(bookmaker_data.get('key'), bookmaker_data.get('title'))
+                bookmakers.append(bookmaker)
+                if not isinstance(bookmaker_data.get('markets'), list):
+                    continue
+                for market in bookmaker_data['markets']:
+                    quotes = markets.get(market['key'])
+                    if quotes is None:
+                        quotes = markets[intern(market['key'])] = MarketQuotes()
+                    # The hot loop of loading odds, so the columns are appended to directly
+                    for outcome in market['outcomes']:
+                        price = outcome['price']
+                        point = outcome.get('point')
+                        quotes.bookmakers.append(bookmaker)
+                        quotes.names.append(intern(outcome['name']))
+                        quotes.prices.append(share_float(price, price) if type(price) is float else price)
+                        quotes.points.append(share_float(point, point) if type(point) is float else point)
+        return Event(data.get('id'), self.text(data.get('sport_key')), self.text(data.get('sport_title')),
+                     self.text(data.get('commence_time')), self.text(data.get('home_team')),
+                     self.text(data.get('away_team')), tuple(bookmakers), markets)
+
+    def bookmaker(self, key, title):
+        bookmaker = self.bookmakers.get((key, title))
+        if bookmaker is None:
+            bookmaker = self.bookmakers[(key, title)] = Bookmaker(self.text(key), self.text(title))
+        return bookmaker
+
+    def text(self, value):
+        return sys.intern(value) if isinstance(value, str) else value
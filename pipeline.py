@@ -0,0 +1,45 @@
+import json
+from arbitrage_finder import ArbitrageFinder
+
+RESULTS_FILE = 'arbitrage_results.json'
+
+
+def find_opportunities(config, watch=None, min_remaining=0, max_interval=1800, budget_horizon=None):
+    """
+    Fetch odds and analyze them in this process, returning the results
+    dict that is written to arbitrage_results.json. With watch set to a
+    number of seconds, poll until interrupted and return the opportunities
+    current at that point. With a bankroll configured, every opportunity
+    also gets its stakes.
+    """
+    finder = ArbitrageFinder(config)
+    metrics_server = None
+    try:
+        if config.metrics_port:
+            from metrics import serve_metrics
+            metrics_server = serve_metrics(finder.metrics, config.metrics_port)
+        if watch:
+            from watcher import ArbitrageWatcher
+            watcher = ArbitrageWatcher(finder, watch, min_remaining=min_remaining,
+                                       max_interval=max_interval, budget_horizon=budget_horizon)
+            results = watcher.run()
+        else:
+            results = finder.find_arbitrage()
+    finally:
+        if metrics_server:
+            metrics_server.shutdown()
+        finder.close()
+    if config.bankroll:
+        allocate_stakes(results, config)
+    return results
+
+
+def allocate_stakes(results, config):
+    from stakes import StakeAllocator, load_balances
+    allocator = StakeAllocator(config.bankroll, load_balances(config.balances_file), config.stake_unit)
+    results['stakes'] = allocator.allocate(results['arbitrage_opportunities'])
+
+
+def save_results(results, path=RESULTS_FILE):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
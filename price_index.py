@@ -0,0 +1,185 @@
+import heapq
+import math
+
+# Markets whose arbitrage condition is a sum of 1/best price over a group of
+# outcomes: every outcome of h2h/outrights, Over and Under of one totals
+# line, or both teams at one spreads point. Lay markets are not indexed.
+INDEXED_MARKETS = ('h2h', 'outrights', 'totals', 'spreads')
+# Slack for the index's sums differing from the finder's in the last bits
+TOLERANCE = 1e-9
+
+
+class OutcomePrices:
+    """
+    Every bookmaker's price for one (market, point, outcome), with the best
+    on top of a max-heap. Replaced prices stay in the heap until they reach
+    the top, so an update is a single O(log n) push.
+    """
+
+    __slots__ = ('prices', 'heap')
+
+    def __init__(self):
+        self.prices = {}  # bookmaker -> price
+        self.heap = []  # (-price, bookmaker), possibly stale
+
+    def update(self, bookmaker, price):
+        if price is None:
+            self.prices.pop(bookmaker, None)
+        else:
+            self.prices[bookmaker] = price
+            heapq.heappush(self.heap, (-price, bookmaker))
+        if len(self.heap) > 2 * len(self.prices) + 8:
+            # Too many stale entries, so rebuild from the current prices
+            self.heap = [(-p, b) for b, p in self.prices.items()]
+            heapq.heapify(self.heap)
+
+    def best(self):
+        heap = self.heap
+        while heap:
+            price, bookmaker = heap[0]
+            if self.prices.get(bookmaker) == -price:
+                return -price
+            heapq.heappop(heap)
+        return None
+
+
+class EventPriceIndex:
+    """
+    Best prices of one event, kept up to date one quote at a time.
+
+    Quotes are grouped by (market, point); a group's implied probability
+    sum is recomputed from its outcomes' best prices whenever one of them
+    changes, and each market's lowest group sum is cached until the next
+    update that could raise it.
+    """
+
+    def __init__(self):
+        self.quotes = {}  # (market, bookmaker, name, point) -> price
+        self.groups = {}  # (market, point) -> {name: OutcomePrices}
+        self.group_sums = {}  # (market, point) -> implied probability sum
+        self.market_groups = {}  # market -> set of (market, point)
+        self.best_sums = {}  # market -> lowest group sum, dropped when stale
+
+    def update(self, market, bookmaker, name, point, price):
+        """Set a bookmaker's price for an outcome; a price of None removes it."""
+        key = (market, bookmaker, name, point)
+        if self.quotes.get(key) == price:
+            return
+        if price is None:
+            del self.quotes[key]
+        else:
+            self.quotes[key] = price
+
+        group_key = (market, point)
+        group = self.groups.get(group_key)
+        if group is None:
+            group = self.groups[group_key] = {}
+            self.market_groups.setdefault(market, set()).add(group_key)
+        outcome = group.get(name)
+        if outcome is None:
+            outcome = group[name] = OutcomePrices()
+        outcome.update(bookmaker, price)
+
+        old_sum = self.group_sums.get(group_key, math.inf)
+        new_sum = self.group_sum(group)
+        self.group_sums[group_key] = new_sum
+        best = self.best_sums.get(market)
+        if best is not None:
+            if new_sum <= best:
+                self.best_sums[market] = new_sum
+            elif old_sum <= best:
+                # The group that held the minimum got worse
+                del self.best_sums[market]
+
+    def group_sum(self, group):
+        total = 0.0
+        priced = 0
+        for outcome in group.values():
+            best = outcome.best()
+            if best is not None and best > 0:
+                total += 1 / best
+                priced += 1
+        return total if priced >= 2 else math.inf
+
+    def best_implied(self, market):
+        """Lowest implied probability sum over the market's groups, or inf."""
+        best = self.best_sums.get(market)
+        if best is None:
+            best = min((self.group_sums[key] for key in self.market_groups.get(market, ())), default=math.inf)
+            self.best_sums[market] = best
+        return best
+
+
+class BestPriceIndex:
+    """
+    Per-event EventPriceIndexes for a polling or streaming feed.
+
+    update_event diffs a fresh copy of an event against what the index
+    holds and applies only the quotes that changed. may_have_arbitrage
+    then says whether any configured market could clear the cutoff, so
+    callers can skip a full re-evaluation of events that cannot.
+    """
+
+    def __init__(self, markets, threshold, standardize_team_name):
+        self.markets = markets
+        # Highest implied probability sum that still meets the profit
+        # cutoff, from ArbitrageFinder.implied_limit
+        self.threshold = threshold
+        self.standardize_team_name = standardize_team_name
+        self.events = {}  # event id -> EventPriceIndex
+
+    def update_event(self, event_id, event):
+        """Apply an event's current quotes; returns how many quotes changed."""
+        index = self.events.get(event_id)
+        if index is None:
+            index = self.events[event_id] = EventPriceIndex()
+        current = {}
+        for key, price in self.event_quotes(event):
+            # A quote listed twice counts at its better price, as in get_best_odds
+            if key not in current or price > current[key]:
+                current[key] = price
+        changed = 0
+        for key in [key for key in index.quotes if key not in current]:
+            index.update(*key, None)
+            changed += 1
+        for key, price in current.items():
+            if index.quotes.get(key) != price:
+                index.update(*key, price)
+                changed += 1
+        return changed
+
+    def event_quotes(self, event):
+        """((market, bookmaker, name, point), price) for every indexed quote of an event."""
+        event_teams = [event.home_team, event.away_team]
+        for market in INDEXED_MARKETS:
+            quotes = event.markets.get(market) if market in self.markets else None
+            if quotes is None:
+                continue
+            for bookmaker, name, price, point in quotes:
+                if market in ('h2h', 'outrights'):
+                    point = None
+                elif point is None:
+                    continue
+                elif market == 'totals':
+                    if name not in ('Over', 'Under'):
+                        continue
+                else:
+                    # Spreads are matched to the event's teams like get_best_odds does
+                    name = self.standardize_team_name(name, event_teams)
+                    if not name:
+                        continue
+                yield (market, bookmaker.title, name, point), price
+
+    def may_have_arbitrage(self, event_id):
+        index = self.events.get(event_id)
+        if index is None:
+            return True
+        for market in self.markets:
+            if market not in INDEXED_MARKETS:
+                return True
+            if index.best_implied(market) <= self.threshold + TOLERANCE:
+                return True
+        return False
+
+    def remove(self, event_id):
+        self.events.pop(event_id, None)
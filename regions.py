@@ -0,0 +1,37 @@
+REGIONS = ["eu", "us", "uk", "au"]
+
+# Home region of each bookmaker key returned by The Odds API. Books that
+# appear in several regions are listed under the one they are licensed in.
+BOOKMAKER_REGIONS = {
+    # us
+    'betonlineag': 'us', 'betmgm': 'us', 'betrivers': 'us', 'betus': 'us', 'bovada': 'us',
+    'draftkings': 'us', 'fanduel': 'us', 'lowvig': 'us', 'mybookieag': 'us', 'pointsbetus': 'us',
+    'superbook': 'us', 'twinspires': 'us', 'unibet_us': 'us', 'williamhill_us': 'us', 'wynnbet': 'us',
+    'ballybet': 'us', 'betparx': 'us', 'espnbet': 'us', 'fliff': 'us', 'hardrockbet': 'us',
+    'windcreek': 'us', 'fanatics': 'us', 'betanysports': 'us', 'barstool': 'us', 'circasports': 'us',
+    # uk
+    'betfair_ex_uk': 'uk', 'betfair_sb_uk': 'uk', 'betvictor': 'uk', 'betway': 'uk', 'boylesports': 'uk',
+    'casumo': 'uk', 'coral': 'uk', 'grosvenor': 'uk', 'ladbrokes_uk': 'uk', 'leovegas': 'uk',
+    'livescorebet': 'uk', 'matchbook': 'uk', 'mrgreen': 'uk', 'paddypower': 'uk', 'skybet': 'uk',
+    'smarkets': 'uk', 'unibet_uk': 'uk', 'virginbet': 'uk', 'williamhill': 'uk', 'sport888': 'uk',
+    # eu
+    'betclic': 'eu', 'betfair_ex_eu': 'eu', 'betsson': 'eu', 'coolbet': 'eu', 'everygame': 'eu',
+    'gtbets': 'eu', 'livescorebet_eu': 'eu', 'marathonbet': 'eu', 'nordicbet': 'eu', 'onexbet': 'eu',
+    'pinnacle': 'eu', 'suprabets': 'eu', 'tipico_de': 'eu', 'unibet_eu': 'eu', 'unibet_fr': 'eu',
+    'unibet_it': 'eu', 'unibet_nl': 'eu', 'winamax_de': 'eu', 'winamax_fr': 'eu',
+    # au
+    'betfair_ex_au': 'au', 'betr_au': 'au', 'betright': 'au', 'bet365_au': 'au', 'boombet': 'au',
+    'ladbrokes_au': 'au', 'neds': 'au', 'playup': 'au', 'pointsbetau': 'au', 'sportsbet': 'au',
+    'tab': 'au', 'tabtouch': 'au', 'topsport': 'au', 'unibet': 'au',
+}
+
+
+def bookmaker_region(bookmaker_key, regions):
+    """
+    Region a bookmaker was fetched for. With a single requested region this
+    is that region; otherwise the book's home region, or None if unknown.
+    """
+    if len(regions) == 1:
+        return regions[0]
+    region = BOOKMAKER_REGIONS.get(bookmaker_key)
+    return region if region in regions else None
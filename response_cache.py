@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from fast_json import loads
+
+
+class ResponseCache:
+    """
+    On-disk cache of API responses keyed by endpoint and request params.
+
+    Every endpoint has its own time-to-live in seconds, and the number of
+    cached responses is capped; the least recently used entries are
+    removed first. The API key is never part of the cache key.
+    """
+
+    def __init__(self, directory, ttls, max_entries=256):
+        self.directory = directory
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        # Oldest first, so the front of the index is the next to evict
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                path = os.path.join(directory, name)
+                entries.append((os.path.getmtime(path), name[:-5]))
+        self.index = OrderedDict((key, None) for _, key in sorted(entries))
+
+    def get(self, endpoint, url, params):
+        """Return the cached response data, or None if missing or expired."""
+        key = self.cache_key(url, params)
+        path = self.entry_path(key)
+        with self.lock:
+            if key not in self.index:
+                self.misses += 1
+                return None
+            try:
+                with open(path, 'rb') as f:
+                    entry = loads(f.read())
+            except (OSError, ValueError):
+                self.remove(key)
+                self.misses += 1
+                return None
+            if time.time() - entry['stored_at'] > self.ttls.get(endpoint, 0):
+                self.misses += 1
+                return None
+            self.index.move_to_end(key)
+            os.utime(path)
+            self.hits += 1
+            return entry['data']
+
+    def put(self, endpoint, url, params, data):
+        key = self.cache_key(url, params)
+        path = self.entry_path(key)
+        entry = {'endpoint': endpoint, 'stored_at': time.time(), 'data': data}
+        with self.lock:
+            # Write then rename, so readers never see a partial entry
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+            self.index[key] = None
+            self.index.move_to_end(key)
+            while len(self.index) > self.max_entries:
+                self.remove(next(iter(self.index)))
+
+    def remove(self, key):
+        self.index.pop(key, None)
+        try:
+            os.remove(self.entry_path(key))
+        except OSError:
+            pass
+
+    def cache_key(self, url, params):
+        public_params = {k: v for k, v in params.items() if k != 'api_key'}
+        raw = url + '?' + json.dumps(public_params, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + '.json')
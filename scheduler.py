@@ -0,0 +1,145 @@
+import math
+import time
+from datetime import datetime, timezone
+
+# Weight given to sports with no events, relative to the hottest sport
+MIN_WEIGHT = 0.05
+# Smoothing factor for the per-sport arbitrage yield
+YIELD_DECAY = 0.7
+
+
+class RequestScheduler:
+    """
+    Decides which sports to poll on each watch-mode cycle.
+
+    Every sport gets a weight from its recent arbitrage yield, its event
+    count and how soon its next event starts. Hot sports are polled every
+    base_interval seconds and colder ones proportionally less often, up to
+    max_interval. When the polling rate would spend the remaining credits
+    before the budget horizon, all intervals are stretched by the same
+    factor, so polling slows down gradually as the quota drains. Credits
+    are counted per sport, from the markets OddsAPI requests for it.
+    """
+
+    def __init__(self, odds_api, base_interval, max_interval=1800, budget_horizon=None, min_remaining=0):
+        self.odds_api = odds_api
+        self.config = odds_api.config
+        self.base_interval = base_interval
+        self.max_interval = max(max_interval, base_interval)
+        self.budget_horizon = budget_horizon
+        self.min_remaining = min_remaining
+        self.stats = {}  # sport key -> {'yield', 'events', 'next_commence', 'next_due', 'polls'}
+        self.backoff = 1.0
+
+    def request_cost(self, sport_key):
+        # The Odds API charges one credit per market and region on each /odds
+        # call. A lay market also fetches its back market, and a sport is only
+        # asked for the markets it can have, so count what is actually sent.
+        return len(self.odds_api.markets_for_sport(sport_key)) * len(self.config.regions)
+
+    def sport_stats(self, sport_key):
+        if sport_key not in self.stats:
+            self.stats[sport_key] = {'yield': 0.0, 'events': None, 'next_commence': None, 'next_due': 0.0, 'polls': 0}
+        return self.stats[sport_key]
+
+    def record(self, sport_key, odds, arb_count, now=None):
+        """Update a sport's statistics after it was polled."""
+        now = time.time() if now is None else now
+        stats = self.sport_stats(sport_key)
+        stats['yield'] = YIELD_DECAY * stats['yield'] + (1 - YIELD_DECAY) * arb_count
+        stats['events'] = len(odds)
+        stats['next_commence'] = self.next_commence(odds, now)
+        stats['polls'] += 1
+
+    def weight(self, sport_key, now):
+        stats = self.sport_stats(sport_key)
+        if stats['events'] is None:
+            return 1.0  # never polled, treat as hot until we know better
+        if stats['events'] == 0:
+            return MIN_WEIGHT
+
+        max_events = max((s['events'] or 0) for s in self.stats.values()) or 1
+        max_yield = max(s['yield'] for s in self.stats.values())
+        event_factor = math.log1p(stats['events']) / math.log1p(max_events)
+        yield_factor = stats['yield'] / max_yield if max_yield > 0 else 0.0
+        if stats['next_commence'] is None:
+            proximity = 0.0
+        else:
+            hours = max(0.0, stats['next_commence'] - now) / 3600
+            proximity = 1 / (1 + hours / 24)
+
+        weight = (0.25 + 0.75 * event_factor) * (0.5 + 0.5 * proximity) * (1 + 2 * yield_factor) / 3
+        return min(1.0, max(MIN_WEIGHT, weight))
+
+    def intervals(self, sport_keys, remaining_requests, now):
+        """Polling interval in seconds for every sport, after quota scaling."""
+        intervals = {key: min(self.max_interval, self.base_interval / self.weight(key, now)) for key in sport_keys}
+        return {key: interval * self.quota_factor(intervals, remaining_requests, now) * self.backoff
+                for key, interval in intervals.items()}
+
+    def quota_factor(self, intervals, remaining_requests, now):
+        """
+        How much to stretch the intervals so that the planned polling rate
+        fits the credits left above the reserve until the budget horizon.
+        """
+        if remaining_requests is None or not intervals:
+            return 1.0
+        available = float(remaining_requests) - self.min_remaining
+        if available <= 0:
+            return math.inf
+        horizon = self.budget_horizon or self.seconds_until_reset(now)
+        planned = sum(self.request_cost(key) / interval for key, interval in intervals.items()) * horizon
+        return max(1.0, planned / available)
+
+    def due_sports(self, sports, remaining_requests, now=None):
+        """
+        Sport keys to poll now, hottest first, limited to what the
+        remaining credits above the reserve can pay for.
+        """
+        now = time.time() if now is None else now
+        keys = [sport['key'] for sport in sports]
+        intervals = self.intervals(keys, remaining_requests, now)
+        due = [key for key in keys if self.sport_stats(key)['next_due'] <= now and math.isfinite(intervals[key])]
+        due.sort(key=lambda key: self.weight(key, now), reverse=True)
+
+        if remaining_requests is not None:
+            available = float(remaining_requests) - self.min_remaining
+            affordable = []
+            for key in due:
+                cost = self.request_cost(key)
+                if cost <= available:
+                    affordable.append(key)
+                    available -= cost
+            due = affordable
+
+        for key in due:
+            self.sport_stats(key)['next_due'] = now + intervals[key]
+        return due
+
+    def back_off(self):
+        """Stretch every interval after the API throttled us."""
+        self.backoff = min(self.backoff * 2, self.max_interval / self.base_interval)
+
+    def recover(self):
+        """Ease back towards the normal rate after a successful poll."""
+        self.backoff = max(1.0, self.backoff / 2)
+
+    def next_commence(self, odds, now):
+        upcoming = []
+        for event in odds:
+            try:
+                start = datetime.fromisoformat(event.commence_time.replace('Z', '+00:00')).timestamp()
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if start >= now:
+                upcoming.append(start)
+        return min(upcoming) if upcoming else None
+
+    def seconds_until_reset(self, now):
+        # The Odds API quota resets at the start of each calendar month (UTC)
+        current = datetime.fromtimestamp(now, timezone.utc)
+        if current.month == 12:
+            reset = current.replace(year=current.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        else:
+            reset = current.replace(month=current.month + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        return max(reset.timestamp() - now, self.base_interval)
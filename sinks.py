@@ -0,0 +1,133 @@
+import json
+import logging
+import sys
+import threading
+import time
+
+
+class JsonLinesSink:
+    """Appends one JSON record per line to a file or named pipe, flushing each line."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def emit(self, record):
+        line = json.dumps(record) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class StdoutSink:
+    """Writes one JSON record per line to standard output."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record) + '\n'
+        with self.lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+    def close(self):
+        pass
+
+
+class SocketSink:
+    """
+    Sends one JSON record per line to a TCP (tcp://host:port) or Unix
+    domain (unix:///path) socket. While the consumer is unreachable,
+    records are dropped and a reconnect is tried every retry_interval
+    seconds.
+    """
+
+    def __init__(self, address, retry_interval=5.0):
+        self.address = address
+        self.retry_interval = retry_interval
+        self.lock = threading.Lock()
+        self.sock = None
+        self.retry_at = 0.0
+        self.dropped = 0
+
+    def connect(self):
+        import socket
+        if self.address.startswith('unix://'):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.address[len('unix://'):])
+        else:
+            host, _, port = self.address[len('tcp://'):].rpartition(':')
+            sock = socket.create_connection((host, int(port)))
+        return sock
+
+    def emit(self, record):
+        data = (json.dumps(record) + '\n').encode('utf-8')
+        with self.lock:
+            if self.sock is None and time.monotonic() < self.retry_at:
+                self.dropped += 1
+                return
+            try:
+                if self.sock is None:
+                    self.sock = self.connect()
+                self.sock.sendall(data)
+            except OSError as e:
+                logging.warning("Could not send result to %s: %s", self.address, e)
+                self.dropped += 1
+                self.retry_at = time.monotonic() + self.retry_interval
+                self.close_socket()
+
+    def close_socket(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def close(self):
+        with self.lock:
+            self.close_socket()
+        if self.dropped:
+            logging.warning("Dropped %d results that could not be sent to %s", self.dropped, self.address)
+
+
+class MultiSink:
+    """Fans every record out to several sinks."""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def emit(self, record):
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def create_sink(spec):
+    """
+    Build a sink from a command-line spec: '-' or 'stdout' for standard
+    output, tcp://host:port or unix:///path for a socket, and anything else
+    is a JSON Lines file or named pipe path.
+    """
+    if spec in ('-', 'stdout'):
+        return StdoutSink()
+    if spec.startswith(('tcp://', 'unix://')):
+        return SocketSink(spec)
+    return JsonLinesSink(spec)
+
+
+def create_sinks(specs):
+    """Combine the sinks for specs into one, or None when there are none."""
+    if not specs:
+        return None
+    sinks = [create_sink(spec) for spec in specs]
+    return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
@@ -0,0 +1,273 @@
+import json
+import struct
+import threading
+import zlib
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from fast_json import loads
+
+RECORD_TYPES = ('sports', 'odds')
+
+# Compressed archives start with this, then the index length as a
+# big-endian uint32, the JSON index and the zlib-compressed records
+ARCHIVE_MAGIC = b'ODDSARC1'
+ARCHIVE_HEADER = struct.Struct('>8sI')
+ARCHIVE_SUFFIX = '.snap'
+
+
+class SnapshotWriter:
+    """
+    Append-only capture of API responses in JSON Lines format.
+    Each record is one line holding a single /sports or /odds response
+    with the time it was fetched, so a crash loses at most the last line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+
+    def write_sports(self, sports_data):
+        self.write_record({'type': 'sports', 'fetched_at': self.timestamp(), 'data': sports_data})
+
+    def write_odds(self, sport, odds_data):
+        self.write_record({'type': 'odds', 'sport': sport, 'fetched_at': self.timestamp(), 'data': odds_data})
+
+    def write_record(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self.lock:
+            if self.file is None:
+                if not appendable(self.path):
+                    raise ValueError(f"{self.path} is not a JSON Lines capture and would be unreadable after appending")
+                self.file = open(self.path, 'a', buffering=1024 * 1024)
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def timestamp(self):
+        return datetime.now(timezone.utc).isoformat()
+
+
+def load_snapshot(path, convert_odds=None):
+    """
+    Load a capture written by SnapshotWriter or a legacy
+    {'sports': [...], 'odds': {sport: [...]}} JSON file.
+    Returns the legacy layout in both cases; when a sport was captured
+    more than once the latest record wins. convert_odds, if given, is
+    applied to each sport's odds as soon as they are read, so captures
+    never hold more than one sport's raw response at a time.
+    For a compressed archive each sport is only read and converted when
+    its odds are first looked up.
+    """
+    if is_archive(path):
+        return SnapshotArchive(path).load(convert_odds)
+    data = {'sports': [], 'odds': {}, 'fetched_at': {}}
+    for record in iter_records(path):
+        apply_record(data, record, convert_odds)
+    return data
+
+
+def iter_records(path):
+    """
+    Yield the records of a capture in the order they were written. A
+    legacy JSON file is turned into a sports record followed by one odds
+    record per sport, with no fetch time.
+    """
+    if is_archive(path):
+        yield from SnapshotArchive(path).iter_records()
+        return
+    # Read as bytes, which the decoders take without a separate UTF-8 pass
+    with open(path, 'rb') as f:
+        first_line = f.readline()
+        try:
+            first = loads(first_line)
+        except ValueError:
+            first = None
+
+        if first is None:
+            # Pretty-printed legacy file spread over several lines
+            f.seek(0)
+            yield from legacy_records(loads(f.read()))
+            return
+        if first.get('type') not in RECORD_TYPES:
+            # Compact legacy file: the first line was the whole snapshot
+            yield from legacy_records(first)
+            return
+
+        yield first
+        for line in f:
+            try:
+                record = loads(line)
+            except ValueError:
+                # A partially written trailing record from an interrupted capture
+                continue
+            yield record
+
+
+def legacy_records(data):
+    yield {'type': 'sports', 'data': data.get('sports', [])}
+    for sport, odds in data.get('odds', {}).items():
+        yield {'type': 'odds', 'sport': sport, 'fetched_at': None, 'data': odds}
+
+
+def apply_record(data, record, convert_odds=None):
+    if record.get('type') == 'sports':
+        data['sports'] = record['data']
+    elif record.get('type') == 'odds':
+        odds = record['data']
+        data['odds'][record['sport']] = convert_odds(odds) if convert_odds is not None else odds
+        data['fetched_at'][record['sport']] = record.get('fetched_at')
+
+
+def appendable(path):
+    """
+    True when SnapshotWriter can append to path: it does not exist yet, is
+    empty, or already holds JSON Lines records. Appending to a legacy JSON
+    file or an archive would make it unreadable.
+    """
+    try:
+        with open(path, 'rb') as f:
+            first_line = f.readline()
+    except FileNotFoundError:
+        return True
+    if not first_line:
+        return True
+    try:
+        first = loads(first_line)
+    except ValueError:
+        return False
+    return isinstance(first, dict) and first.get('type') in RECORD_TYPES
+
+
+def is_archive(path):
+    with open(path, 'rb') as f:
+        return f.read(len(ARCHIVE_MAGIC)) == ARCHIVE_MAGIC
+
+
+def write_archive(records, path, level=9):
+    """
+    Write records, as yielded by iter_records, to a compressed archive.
+    Every record's data is compressed on its own and the index at the
+    front gives its byte offset, so a reader can seek straight to it.
+    Returns the number of records written.
+    """
+    index = []
+    blocks = []
+    offset = 0
+    for record in records:
+        block = zlib.compress(json.dumps(record['data'], separators=(',', ':')).encode('utf-8'), level)
+        entry = {'type': record.get('type'), 'offset': offset, 'length': len(block)}
+        if record.get('type') == 'odds':
+            entry['sport'] = record['sport']
+            entry['fetched_at'] = record.get('fetched_at')
+        index.append(entry)
+        blocks.append(block)
+        offset += len(block)
+    index_bytes = json.dumps({'version': 1, 'records': index}, separators=(',', ':')).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, len(index_bytes)))
+        f.write(index_bytes)
+        for block in blocks:
+            f.write(block)
+    return len(index)
+
+
+class SnapshotArchive:
+    """
+    Reader for archives written by write_archive. Only the index is read
+    up front; each record is read by seeking to its offset.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, index_length = ARCHIVE_HEADER.unpack(f.read(ARCHIVE_HEADER.size))
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"{path} is not a snapshot archive")
+            self.records = loads(f.read(index_length))['records']
+        self.data_start = ARCHIVE_HEADER.size + index_length
+
+    def read(self, entry, f=None):
+        """The data of one index entry."""
+        if f is None:
+            with open(self.path, 'rb') as f:
+                return self.read(entry, f)
+        f.seek(self.data_start + entry['offset'])
+        return loads(zlib.decompress(f.read(entry['length'])))
+
+    def iter_records(self):
+        with open(self.path, 'rb') as f:
+            for entry in self.records:
+                record = {'type': entry['type'], 'data': self.read(entry, f)}
+                if entry['type'] == 'odds':
+                    record['sport'] = entry['sport']
+                    record['fetched_at'] = entry.get('fetched_at')
+                yield record
+
+    def load(self, convert_odds=None):
+        """The load_snapshot layout, reading each sport's odds on first use."""
+        sports = None
+        latest = {}
+        for entry in self.records:
+            if entry['type'] == 'sports':
+                sports = entry
+            elif entry['type'] == 'odds':
+                latest[entry['sport']] = entry
+        return {
+            'sports': self.read(sports) if sports else [],
+            'odds': ArchiveOdds(self, latest, convert_odds),
+            'fetched_at': {sport: entry.get('fetched_at') for sport, entry in latest.items()},
+        }
+
+
+class ArchiveOdds(Mapping):
+    """Sport key -> odds, read from an archive and converted on first access."""
+
+    def __init__(self, archive, entries, convert_odds=None):
+        self.archive = archive
+        self.entries = entries
+        self.convert_odds = convert_odds
+        self.loaded = {}
+
+    def __getitem__(self, sport):
+        if sport not in self.loaded:
+            odds = self.archive.read(self.entries[sport])
+            self.loaded[sport] = self.convert_odds(odds) if self.convert_odds is not None else odds
+        return self.loaded[sport]
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def main():
+    import argparse
+    import os
+    parser = argparse.ArgumentParser(description="Convert saved captures into compressed, indexed snapshot archives")
+    parser.add_argument("inputs", nargs="+", help="--save captures, legacy {'sports': ..., 'odds': ...} JSON files or archives")
+    parser.add_argument("-o", "--output", help=f"Archive to write, for a single input (default: the input path with a {ARCHIVE_SUFFIX} suffix)")
+    parser.add_argument("--level", type=int, default=9, choices=range(1, 10), metavar="1-9", help="zlib compression level")
+    args = parser.parse_args()
+    if args.output and len(args.inputs) > 1:
+        parser.error("--output needs a single input")
+
+    for path in args.inputs:
+        output = args.output or os.path.splitext(path)[0] + ARCHIVE_SUFFIX
+        if os.path.abspath(output) == os.path.abspath(path):
+            print(f"Skipping {path}: it would be overwritten")
+            continue
+        count = write_archive(iter_records(path), output, args.level)
+        size, packed = os.path.getsize(path), os.path.getsize(output)
+        print(f"{path} -> {output}: {count} records, {size / 1e6:.1f} MB -> {packed / 1e6:.1f} MB "
+              f"({size / max(packed, 1):.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import heapq
+import json
+import logging
+import math
+from collections import defaultdict
+from config import LAY_MARKETS
+
+# Slack for float error when rounding stakes up and checking limits
+EPSILON = 1e-9
+
+
+def stake_legs(arb):
+    """
+    The bets of an opportunity as (outcome, scenario, bookmaker, cost,
+    payout) legs. A stake s on a leg draws s * cost from its bookmaker's
+    balance and returns s * payout when its scenario happens. Back bets
+    cost their stake and pay the price; a lay bet costs its liability and
+    pays it back plus the stake after commission when the runner loses.
+    """
+    if arb.get('market') in LAY_MARKETS:
+        runner = arb['runner']
+        back, lay = f"Back {runner}", f"Lay {runner}"
+        return [
+            (back, f"{runner} wins", arb['bookmakers'][back], 1, arb['back_price_effective']),
+            (lay, f"{runner} loses", arb['bookmakers'][lay], arb['lay_price'] - 1,
+             arb['lay_price'] - arb['commission']),
+        ]
+    return [(outcome, outcome, arb['bookmakers'][outcome], 1, odd)
+            for outcome, odd in arb['best_odds'].items() if outcome != 'spread']
+
+
+def round_stakes(legs, budget, unit, limits=None):
+    """
+    Stakes for each leg that maximize the guaranteed profit while the total
+    cost stays within budget and each bookmaker's cost within its limit.
+    With a rounding unit every stake is a whole number of units: for a
+    guaranteed return R the cheapest stakes are ceil(R / payout) units, so
+    only returns that some leg hits exactly need to be tried. They are
+    tried from the largest affordable one down, until no smaller return
+    can beat the best profit found. Returns None when no stakes fit.
+    """
+    limits = limits or {}
+    shares = defaultdict(float)
+    for _, _, bookmaker, cost, payout in legs:
+        shares[bookmaker] += cost / payout
+    total_share = sum(shares.values())
+    # Largest guaranteed return the budget and balances allow
+    top = budget / total_share
+    for bookmaker, share in shares.items():
+        if bookmaker in limits:
+            top = min(top, limits[bookmaker] / share)
+    if top <= 0:
+        return None
+    if not unit:
+        return [top / payout for _, _, _, _, payout in legs]
+
+    # (-return, leg, units) for the next return each leg hits exactly
+    returns = []
+    for index, (_, _, _, _, payout) in enumerate(legs):
+        units = math.floor(top / (unit * payout) + EPSILON)
+        if units >= 1:
+            returns.append((-units * unit * payout, index, units))
+    heapq.heapify(returns)
+
+    best = None
+    best_profit = -math.inf
+    while returns:
+        target, index, n = heapq.heappop(returns)
+        target = -target
+        # Stakes returning at least R cost at least R * total_share
+        if target * (1 - total_share) <= best_profit:
+            break
+        if n > 1:
+            heapq.heappush(returns, (-(n - 1) * unit * legs[index][4], index, n - 1))
+        stakes = [math.ceil(target / (unit * leg[4]) - EPSILON) * unit for leg in legs]
+        if not fits(legs, stakes, budget, limits):
+            continue
+        profit = guaranteed_profit(legs, stakes)
+        if profit > best_profit:
+            best, best_profit = stakes, profit
+    return best
+
+
+def fits(legs, stakes, budget, limits):
+    used = defaultdict(float)
+    for (_, _, bookmaker, cost, _), stake in zip(legs, stakes):
+        used[bookmaker] += stake * cost
+    if sum(used.values()) > budget + EPSILON:
+        return False
+    return all(used[bookmaker] <= limits[bookmaker] + EPSILON for bookmaker in used if bookmaker in limits)
+
+
+def guaranteed_profit(legs, stakes):
+    total_cost = sum(stake * leg[3] for leg, stake in zip(legs, stakes))
+    return min(stake * leg[4] for leg, stake in zip(legs, stakes)) - total_cost
+
+
+def load_balances(path):
+    """Bookmaker title -> available balance, from a JSON object file."""
+    if not path:
+        return {}
+    with open(path, 'r') as f:
+        return {bookmaker: float(balance) for bookmaker, balance in json.load(f).items()}
+
+
+class StakeAllocator:
+    """
+    Splits a bankroll over a batch of opportunities without prompting.
+
+    Opportunities are funded in order of guaranteed profit per unit staked,
+    each with as much as the bankroll and the balances of its bookmakers
+    have left, and their rounded stakes are written to arb['stakes'].
+    Opportunities that cannot be funded at a profit get None.
+    """
+
+    def __init__(self, bankroll, balances=None, unit=1):
+        self.bankroll = bankroll
+        self.balances = dict(balances or {})
+        self.unit = unit
+
+    def allocate(self, arbs):
+        remaining = self.bankroll
+        balances = dict(self.balances)
+        total_profit = 0.0
+        funded = 0
+        candidates = []
+        for arb in arbs:
+            arb['stakes'] = None
+            try:
+                legs = stake_legs(arb)
+                rate = 1 / sum(cost / payout for _, _, _, cost, payout in legs) - 1
+            except (KeyError, ZeroDivisionError) as e:
+                logging.warning("Cannot compute stakes for %s: %s", arb.get('event'), e)
+                continue
+            candidates.append((rate, arb, legs))
+        candidates.sort(key=lambda candidate: -candidate[0])
+
+        for rate, arb, legs in candidates:
+            if rate <= 0 or remaining <= 0:
+                continue
+            stakes = round_stakes(legs, remaining, self.unit, balances)
+            if stakes is None or guaranteed_profit(legs, stakes) <= 0:
+                continue
+            arb['stakes'] = self.stake_record(legs, stakes)
+            remaining -= arb['stakes']['total_stake']
+            for (_, _, bookmaker, cost, _), stake in zip(legs, stakes):
+                if bookmaker in balances:
+                    balances[bookmaker] -= stake * cost
+            total_profit += arb['stakes']['guaranteed_profit']
+            funded += 1
+
+        return {
+            'bankroll': self.bankroll,
+            'unit': self.unit,
+            'allocated': self.bankroll - remaining,
+            'guaranteed_profit': total_profit,
+            'funded_opportunities': funded,
+        }
+
+    def stake_record(self, legs, stakes):
+        return {
+            'total_stake': sum(stake * leg[3] for leg, stake in zip(legs, stakes)),
+            'bets': {leg[0]: stake for leg, stake in zip(legs, stakes)},
+            'returns': {leg[1]: stake * leg[4] for leg, stake in zip(legs, stakes)},
+            'guaranteed_profit': guaranteed_profit(legs, stakes),
+        }
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+
+
+def normalize_team_name(name):
+    return ' '.join(name.casefold().split())
+
+
+class LRUDict(OrderedDict):
+    """OrderedDict that drops its least recently used keys beyond max_size."""
+
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+
+    def lookup(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return default
+
+    def store(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+class TeamNameIndex:
+    """
+    Maps bookmaker outcome names onto an event's home/away team names.
+
+    Lookups try, in order: the exact team name, the normalized
+    (case- and whitespace-insensitive) name, a learned alias from earlier
+    fuzzy matches, and only then difflib fuzzy matching. Learned aliases
+    are kept in a bounded LRU and can be saved to a JSON file, so warm
+    starts skip fuzzy matching for names already seen.
+    """
+
+    def __init__(self, path=None, max_aliases=50000, max_events=10000):
+        self.path = path
+        self.aliases = LRUDict(max_aliases)  # normalized outcome name -> team name
+        self.event_indexes = LRUDict(max_events)  # event teams -> {normalized team name: team name}
+        self.misses = LRUDict(max_events)  # (normalized name, event teams) with no match
+        self.dirty = False
+        self.fuzzy_matches = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def lookup(self, team_name, event_teams):
+        if not team_name:
+            return None
+        if team_name in event_teams:
+            return team_name
+
+        teams_key = tuple(event_teams)
+        event_index = self.event_indexes.lookup(teams_key)
+        if event_index is None:
+            event_index = {normalize_team_name(team): team for team in reversed(event_teams)}
+            self.event_indexes.store(teams_key, event_index)
+
+        normalized = normalize_team_name(team_name)
+        if normalized in event_index:
+            return event_index[normalized]
+
+        alias = self.aliases.lookup(normalized)
+        if alias is not None and alias in event_teams:
+            return alias
+
+        if (normalized, teams_key) in self.misses:
+            return None
+        return self.fuzzy_match(team_name, normalized, event_teams, teams_key)
+
+    def fuzzy_match(self, team_name, normalized, event_teams, teams_key):
+        from difflib import get_close_matches
+        self.fuzzy_matches += 1
+        matches = get_close_matches(team_name.lower(), [t.lower() for t in event_teams], n=1, cutoff=0.6)
+        if matches:
+            standardized = next(t for t in event_teams if t.lower() == matches[0])
+            self.aliases.store(normalized, standardized)
+            self.dirty = True
+            return standardized
+
+        self.misses.store((normalized, teams_key), True)
+        logging.warning("No match found for team name: %s", team_name)
+        return None
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                aliases = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Could not load team aliases from %s: %s", self.path, e)
+            return
+        for alias, team in aliases.items():
+            self.aliases.store(alias, team)
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(dict(self.aliases), f, indent=0, sort_keys=True)
+        os.replace(temp_path, self.path)
+        self.dirty = False
@@ -0,0 +1,334 @@
+import logging
+import time
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; ArbitrageFinder falls back to the Python engine
+    np = None
+
+# Tolerance when pre-selecting candidates from NumPy sums; the exact
+# implied probability is recomputed in Python for every candidate.
+CANDIDATE_TOLERANCE = 1e-9
+
+
+def factorize(values):
+    """
+    Dense integer codes for a list of hashable values, numbered in order
+    of first appearance, and each value's first row. The lookups run in
+    C, which is cheap for the interned names of the odds model.
+    """
+    first_rows = {}
+    rows = np.fromiter(map(first_rows.setdefault, values, range(len(values))), dtype=np.int64, count=len(values))
+    dense = np.zeros(len(values), dtype=np.int64)
+    dense[np.fromiter(first_rows.values(), dtype=np.int64, count=len(first_rows))] = np.arange(len(first_rows))
+    return dense[rows], first_rows
+
+
+def group_rows(keys):
+    """
+    Stable order of the rows by key, where each key's run starts in that
+    order, and the run of every sorted row.
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    changed = np.empty(len(keys), dtype=bool)
+    changed[0] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=changed[1:])
+    return order, np.flatnonzero(changed), np.cumsum(changed) - 1
+
+
+def first_per_run(positions, runs):
+    """The first of the sorted positions in each run that has any."""
+    if not len(positions):
+        return positions
+    return positions[np.r_[True, runs[positions][1:] != runs[positions][:-1]]]
+
+
+def best_rows(keys, prices, rows):
+    """
+    Group rows by key. Returns each group's key, its best row (highest
+    price, the earliest on ties as in the Python engine) and its first
+    row, ordered by key.
+    """
+    order, starts, runs = group_rows(keys)
+    sorted_prices = prices[order]
+    maxima = np.fmax.reduceat(sorted_prices, starts)
+    # A group priced only at NaN keeps its first row
+    best = first_per_run(np.flatnonzero((sorted_prices == maxima[runs]) | np.isnan(maxima)[runs]), runs)
+    return keys[order[starts]], rows[order[best]], rows[order[starts]]
+
+
+def highest_prices(odds, key):
+    """Each event's highest positive price in a market, 0 if it has none."""
+    quotes = [event.markets.get(key) for event in odds]
+    counts = np.array([len(market.prices) if market is not None else 0 for market in quotes], dtype=np.int64)
+    prices = np.fromiter(chain.from_iterable(market.prices for market in quotes if market is not None),
+                         dtype=np.float64, count=int(counts.sum()))
+    highest = np.zeros(len(odds), dtype=np.float64)
+    quoted = np.flatnonzero(counts)
+    if len(quoted):
+        highest[quoted] = np.fmax.reduceat(prices, np.cumsum(counts)[quoted] - counts[quoted])
+    return np.maximum(highest, 0)
+
+
+class QuoteColumns:
+    """
+    One market's quotes across a sport's events, or the given indexes of
+    them. Prices and event indexes are NumPy arrays; the other MarketQuotes
+    columns are only concatenated, or looked up row by row, when needed.
+    """
+
+    def __init__(self, odds, key, indexes=None):
+        if indexes is None:
+            indexes = range(len(odds))
+        quotes = [odds[index].markets.get(key) for index in indexes]
+        counts = [len(market.prices) if market is not None else 0 for market in quotes]
+        self.quotes = [market for market in quotes if market is not None]
+        self.size = sum(counts)
+        self.price_array = np.fromiter(chain.from_iterable(market.prices for market in self.quotes),
+                                       dtype=np.float64, count=self.size)
+        self.events = np.repeat(np.asarray(indexes, dtype=np.int64), counts)
+        counts = [count for count in counts if count]
+        self.starts = np.cumsum(counts) - counts
+        self.columns = {}
+
+    def column(self, name):
+        """A MarketQuotes column, such as 'names', over all rows."""
+        if name not in self.columns:
+            self.columns[name] = list(chain.from_iterable(getattr(quotes, name) for quotes in self.quotes))
+        return self.columns[name]
+
+    def values(self, name, rows):
+        """Some rows of a MarketQuotes column, as a list."""
+        rows = np.asarray(rows, dtype=np.int64)
+        positions = np.searchsorted(self.starts, rows, side='right') - 1
+        offsets = rows - self.starts[positions]
+        return [getattr(self.quotes[position], name)[offset]
+                for position, offset in zip(positions.tolist(), offsets.tolist())]
+
+    def point_array(self):
+        """The points as floats, NaN for quotes without one."""
+        if 'point_array' not in self.columns:
+            self.columns['point_array'] = np.array(self.column('points'), dtype=np.float64)
+        return self.columns['point_array']
+
+    def point_codes(self, rows):
+        """Dense codes of the points of rows, which must all have one, and the number of points."""
+        values, codes = np.unique(self.point_array()[rows], return_inverse=True)
+        return codes.reshape(-1), len(values)
+
+    def point_rows(self):
+        """Rows whose quote has a point."""
+        return np.flatnonzero(~np.isnan(self.point_array()))
+
+    def name_array(self):
+        return np.fromiter(chain.from_iterable(quotes.names for quotes in self.quotes), dtype=object,
+                           count=self.size)
+
+
+class VectorizedEngine:
+    """
+    NumPy implementation of ArbitrageFinder.calculate_arbitrage.
+
+    Each market's quotes for a whole sport are concatenated into columns,
+    best prices are found with one sorted group reduction, and implied
+    probability sums are computed for all events at once. Only the events
+    that could reach the cutoff have their best odds built in Python and
+    go through ArbitrageFinder.evaluate_opportunity, so the opportunities
+    are identical to the Python engine's. Spreads are bounded the same way
+    as in ArbitrageFinder.implied_bound and only the remaining events are
+    matched to their teams by the Python walk, as are outright and lay
+    markets.
+    """
+
+    MARKETS = ('h2h', 'totals', 'spreads')
+
+    def __init__(self, finder):
+        self.finder = finder
+        self.config = finder.config
+
+    def calculate_arbitrage(self, odds):
+        return list(self.iter_arbitrage(odds))
+
+    def iter_arbitrage(self, odds):
+        for market in self.config.markets:
+            if market not in self.MARKETS and market not in self.finder.MARKET_HANDLERS:
+                logging.warning("Unsupported market: %s", market)
+
+        started = time.perf_counter()
+        best_odds_by_event = self.best_odds(odds)
+        self.finder.metrics.add_time('best_odds', time.perf_counter() - started)
+        self.finder.metrics.count('pruned_events', len(odds) - len(best_odds_by_event))
+
+        found = 0
+        for index in sorted(best_odds_by_event):
+            event = odds[index]
+            best_odds_by_market = best_odds_by_event[index]
+            for market in self.config.markets:
+                if market not in best_odds_by_market:
+                    continue
+                best_odds, bookmakers, points = best_odds_by_market[market]
+                if best_odds:
+                    arb = self.finder.evaluate_opportunity(event, market, best_odds, bookmakers, points)
+                    if arb:
+                        found += 1
+                        yield arb
+        logging.info("Vectorized engine analyzed %d events, found %d opportunities", len(odds), found)
+
+    def best_odds(self, odds):
+        """
+        Event index -> {market: (best_odds, bookmakers, points)} for the
+        events with at least one market whose best prices could reach the
+        cutoff; the other events are left out.
+        """
+        limit = self.finder.implied_limit() + CANDIDATE_TOLERANCE
+        selected = {}
+        python_markets = {}  # event index -> markets left to the Python walk
+        for market in self.config.markets:
+            if market not in self.MARKETS:
+                continue
+            indexes = None
+            if market != 'h2h':
+                # Both sides of a line are priced no higher than the event's
+                # highest price, so only events where two of it could reach
+                # the cutoff are looked at closely
+                with np.errstate(divide='ignore'):
+                    indexes = np.flatnonzero(2 / highest_prices(odds, market) <= limit).tolist()
+            columns = QuoteColumns(odds, market, indexes)
+            if not columns.size:
+                continue
+            if market == 'h2h':
+                candidates = self.select_h2h(odds, columns, limit)
+            elif market == 'totals':
+                candidates = self.select_totals(odds, columns, limit)
+            else:
+                for index in self.select_spreads(odds, columns, limit):
+                    python_markets.setdefault(index, []).append(market)
+                continue
+            for index, best in candidates.items():
+                selected.setdefault(index, {})[market] = best
+
+        walked = [market for market in self.config.markets
+                  if market not in self.MARKETS and market in self.finder.MARKET_HANDLERS]
+        if walked:
+            finder_limit = self.finder.implied_limit()
+            for index, event in enumerate(odds):
+                viable = self.finder.viable_markets(event, walked, finder_limit)
+                if viable:
+                    python_markets.setdefault(index, []).extend(viable)
+        for index, markets in python_markets.items():
+            selected.setdefault(index, {}).update(self.finder.get_best_odds(odds[index], markets))
+        return selected
+
+    def select_h2h(self, odds, columns, limit):
+        names, name_count = self.outcome_codes(odds, columns)
+        group_keys, best, first = best_rows(columns.events * name_count + names, columns.price_array,
+                                            np.arange(columns.size))
+        group_events = group_keys // name_count
+
+        with np.errstate(divide='ignore'):
+            inverse = 1 / columns.price_array[best]
+        implied = np.bincount(group_events, weights=inverse, minlength=len(odds))
+        outcome_counts = np.bincount(group_events, minlength=len(odds))
+        candidates = (outcome_counts > 1) & (implied <= limit)
+
+        groups = np.flatnonzero(candidates[group_events])
+        # Outcomes in order of first appearance, as the Python engine fills its dicts
+        groups = groups[np.lexsort((first[groups], group_events[groups]))]
+        rows = best[groups]
+        selected = {}
+        for index, name, price, bookmaker in zip(group_events[groups].tolist(), columns.values('names', rows),
+                                                 columns.values('prices', rows), columns.values('bookmakers', rows)):
+            best_odds, bookmakers, _ = selected.setdefault(index, ({}, {}, None))
+            best_odds[name] = price
+            bookmakers[name] = bookmaker.title
+        return selected
+
+    def outcome_codes(self, odds, columns):
+        """
+        Codes of the h2h outcome names: 0 and 1 for the event's home and
+        away team, which most quotes are named after, and dense codes from
+        2 for any other name, such as a draw.
+        """
+        names = columns.name_array()
+        teams = np.array([(event.home_team, event.away_team) for event in odds], dtype=object)
+        home = names == teams[columns.events, 0]
+        away = ~home & (names == teams[columns.events, 1])
+        codes = np.where(home, 0, 1)
+        others = np.flatnonzero(~home & ~away)
+        if not len(others):
+            return codes, 2
+        other_codes, first_rows = factorize(names[others].tolist())
+        codes[others] = other_codes + 2
+        return codes, len(first_rows) + 2
+
+    def select_totals(self, odds, columns, limit):
+        rows = columns.point_rows()
+        names = columns.name_array()[rows]
+        over, under = names == 'Over', names == 'Under'
+        rows, under = rows[over | under], under[over | under]
+        if not len(rows):
+            return {}
+        points, point_count = columns.point_codes(rows)
+        keys = (columns.events[rows] * point_count + points) * 2 + under
+        group_keys, best, first = best_rows(keys, columns.price_array[rows], rows)
+
+        # The Over and Under groups of a point are adjacent
+        pairs = np.flatnonzero((group_keys[:-1] % 2 == 0) & (group_keys[1:] == group_keys[:-1] + 1))
+        over_rows, under_rows = best[pairs], best[pairs + 1]
+        over_prices, under_prices = columns.price_array[over_rows], columns.price_array[under_rows]
+        valid = (over_prices > 0) & (under_prices > 0)
+        pairs, over_rows, under_rows = pairs[valid], over_rows[valid], under_rows[valid]
+        if not len(pairs):
+            return {}
+        implied = 1 / over_prices[valid] + 1 / under_prices[valid]
+        point_first = np.minimum(first[pairs], first[pairs + 1])
+        point_events = group_keys[pairs] // (2 * point_count)
+
+        # Lowest implied probability per event, the first point on ties
+        order = np.lexsort((point_first, implied, point_events))
+        starts = np.flatnonzero(np.r_[True, point_events[order][1:] != point_events[order][:-1]])
+        chosen = order[starts]
+        chosen = chosen[implied[chosen] <= limit]
+
+        over_rows, under_rows = over_rows[chosen], under_rows[chosen]
+        selected = {}
+        for index, over_price, under_price, over_bookmaker, under_bookmaker, point in zip(
+                point_events[chosen].tolist(), columns.values('prices', over_rows), columns.values('prices', under_rows),
+                columns.values('bookmakers', over_rows), columns.values('bookmakers', under_rows),
+                columns.values('points', point_first[chosen])):
+            best_odds = {'Over': over_price, 'Under': under_price}
+            bookmakers = {'Over': over_bookmaker.title, 'Under': under_bookmaker.title}
+            selected[index] = (best_odds, bookmakers, point)
+        return selected
+
+    def select_spreads(self, odds, columns, limit):
+        """
+        Indexes of the events with a point whose two best prices of
+        distinctly named outcomes could reach the cutoff, as bounded by
+        ArbitrageFinder.implied_bound.
+        """
+        rows = columns.point_rows()
+        rows = rows[columns.price_array[rows] > 0]
+        if not len(rows):
+            return []
+        points, point_count = columns.point_codes(rows)
+        order, starts, runs = group_rows(columns.events[rows] * point_count + points)
+        rows = rows[order]
+        prices = columns.price_array[rows]
+
+        # Split each point's quotes into those named like its first quote (A)
+        # and the rest (B). Home and away are named differently, so they are
+        # either an A and a B quote or two B quotes, and no better than
+        # max A and max B, or the two best B prices.
+        names = columns.name_array()[rows]
+        first_name = names[starts][runs] == names
+        max_first = np.maximum.reduceat(np.where(first_name, prices, 0), starts)
+        others = np.where(first_name, 0, prices)
+        max_other = np.maximum.reduceat(others, starts)
+        others[first_per_run(np.flatnonzero((others == max_other[runs]) & (others > 0)), runs)] = 0
+        second_other = np.maximum.reduceat(others, starts)
+        with np.errstate(divide='ignore'):
+            bounds = np.minimum(1 / max_first + 1 / max_other, 1 / max_other + 1 / second_other)
+        return np.unique(columns.events[rows[starts[bounds <= limit]]]).tolist()
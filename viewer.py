@@ -1,7 +1,9 @@
+import argparse
 import json
+import queue
 import webbrowser
 import os
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler, HTTPServer, SimpleHTTPRequestHandler, ThreadingHTTPServer
 import threading
 import signal
 import sys
@@ -18,7 +20,22 @@ def calculate_profit_and_payout(arb, wager):
     payout = wager + profit
     return profit, payout
 
-def generate_html(data):
+def stake_weights(arb):
+    """
+    Relative stake per outcome and their total; the page stakes
+    wager * weight / total on each outcome. Back/lay opportunities lay
+    lay_stake_ratio times the back stake, and the wager is their total
+    outlay: the back stake plus the lay liability, as in stakes.stake_legs.
+    """
+    if 'lay_stake_ratio' in arb:
+        runner = arb['runner']
+        ratio = arb['lay_stake_ratio']
+        return {f"Back {runner}": 1, f"Lay {runner}": ratio}, 1 + ratio * (arb['lay_price'] - 1)
+    # Filter out 'spread' key for implied probability calculation
+    weights = {k: 1/v for k, v in arb['best_odds'].items() if k != 'spread'}
+    return weights, sum(weights.values())
+
+def render_page(total_events, total_arbs, opportunities, script=""):
     html_template = """
     <!DOCTYPE html>
     <html lang="en">
@@ -92,6 +109,22 @@ def generate_html(data):
             }}
         </style>
         <script>
+            function updateOpportunity(opp, wager) {{
+                const profitMargin = parseFloat(opp.getAttribute('data-profit-margin')) / 100;
+                const profit = wager * profitMargin;
+                const payout = wager + profit;
+                opp.querySelector('.profit').textContent = profit.toFixed(2);
+                opp.querySelector('.payout').textContent = payout.toFixed(2);
+                
+                const bets = opp.querySelectorAll('.bet-amount');
+                const totalImpliedProb = parseFloat(opp.getAttribute('data-total-implied-prob'));
+                bets.forEach(bet => {{
+                    const impliedProb = parseFloat(bet.getAttribute('data-implied-prob'));
+                    const betAmount = (wager * impliedProb / totalImpliedProb).toFixed(2);
+                    bet.textContent = betAmount;
+                }});
+            }}
+
             function updateProfits() {{
                 const wager = parseFloat(document.getElementById('wager').value);
                 if (isNaN(wager) || wager <= 0) {{
@@ -100,19 +133,7 @@ def generate_html(data):
                 }}
                 const opportunities = document.getElementsByClassName('opportunity');
                 for (let opp of opportunities) {{
-                    const profitMargin = parseFloat(opp.getAttribute('data-profit-margin')) / 100;
-                    const profit = wager * profitMargin;
-                    const payout = wager + profit;
-                    opp.querySelector('.profit').textContent = profit.toFixed(2);
-                    opp.querySelector('.payout').textContent = payout.toFixed(2);
-                    
-                    const bets = opp.querySelectorAll('.bet-amount');
-                    const totalImpliedProb = parseFloat(opp.getAttribute('data-total-implied-prob'));
-                    bets.forEach(bet => {{
-                        const impliedProb = parseFloat(bet.getAttribute('data-implied-prob'));
-                        const betAmount = (wager * impliedProb / totalImpliedProb).toFixed(2);
-                        bet.textContent = betAmount;
-                    }});
+                    updateOpportunity(opp, wager);
                 }}
             }}
             
@@ -129,74 +150,266 @@ def generate_html(data):
         </div>
         <div class="summary">
             <h2>Summary</h2>
-            <p>Total events analyzed: {total_events}</p>
-            <p>Total arbitrage opportunities found: {total_arbs}</p>
+            <p>Total events analyzed: <span id="total-events">{total_events}</span></p>
+            <p>Total arbitrage opportunities found: <span id="total-arbs">{total_arbs}</span></p>
         </div>
         <div id="opportunities">
             {opportunities}
         </div>
+        {script}
     </body>
     </html>
     """
 
+    return html_template.format(
+        total_events=total_events,
+        total_arbs=total_arbs,
+        opportunities=opportunities,
+        script=script
+    )
+
+def generate_html(data):
     # Sort arbitrage opportunities by profit margin in descending order
     sorted_arbs = sorted(data['arbitrage_opportunities'], key=lambda x: x['profit_margin'], reverse=True)
+    opportunities_html = "".join(opportunity_html(arb) for arb in sorted_arbs)
+    return render_page(data['total_events'], data['total_arbitrage_opportunities'], opportunities_html)
 
-    opportunities_html = ""
-    for arb in sorted_arbs:
-        # Filter out 'spread' key for implied probability calculation
-        odds_for_calc = {k: v for k, v in arb['best_odds'].items() if k != 'spread'}
-        total_implied_prob = sum(1/odd for odd in odds_for_calc.values())
-        
-        opportunities_html += f"""
-        <div class="opportunity" data-profit-margin="{arb['profit_margin']}" data-total-implied-prob="{total_implied_prob}">
-            <h2>{arb['event']}</h2>
-            <p>Profit Margin: {arb['profit_margin']:.2f}%</p>
-            <p>Date: {format_date(arb['commence_time'])}</p>
-            <p>Market: {arb.get('market', 'N/A')}</p>
-            """
+def opportunity_html(arb, key=None):
+    weights, total_implied_prob = stake_weights(arb)
+    id_attribute = f' id="{key}"' if key else ''
+
+    opportunities_html = f"""
+        <div class="opportunity"{id_attribute} data-profit-margin="{arb['profit_margin']}" data-total-implied-prob="{total_implied_prob}">
+        <h2>{arb['event']}</h2>
+        <p>Profit Margin: {arb['profit_margin']:.2f}%</p>
+        <p>Date: {format_date(arb['commence_time'])}</p>
+        <p>Market: {arb.get('market', 'N/A')}</p>
+        """
+    
+    if arb.get('market') == 'spreads':
+        opportunities_html += f"<p>Points Spread: {arb.get('points', 'N/A')}</p>"
+    elif arb.get('market') == 'totals':
+        opportunities_html += f"<p>Total Points: {arb.get('points', 'N/A')}</p>"
+    elif 'lay_stake_ratio' in arb:
+        opportunities_html += f"<p>Exchange Commission: {arb['commission'] * 100:.1f}%</p>"
         
-        if arb.get('market') == 'spreads':
-            opportunities_html += f"<p>Points Spread: {arb.get('points', 'N/A')}</p>"
-        elif arb.get('market') == 'totals':
-            opportunities_html += f"<p>Total Points: {arb.get('points', 'N/A')}</p>"
+    opportunities_html += '<div class="odds">'
+    
+    for outcome, odd in arb['best_odds'].items():
+        if outcome != 'spread':  # Skip the spread key when displaying odds
+            bookmaker = arb['bookmakers'][outcome]
+            implied_prob = weights[outcome]
             
-        opportunities_html += '<div class="odds">'
-        
-        for outcome, odd in arb['best_odds'].items():
-            if outcome != 'spread':  # Skip the spread key when displaying odds
-                bookmaker = arb['bookmakers'][outcome]
-                implied_prob = 1 / odd
-                
-                if arb.get('market') == 'spreads':
-                    spread = f"+{arb['points']}" if outcome == 'Underdog' else f"-{arb['points']}"
-                    label = f"{outcome} ({spread})"
-                else:
-                    label = outcome
-                
-                opportunities_html += f"""
-                    <div>
-                        <h3>{label}</h3>
-                        <p>Odds: {odd:.2f}</p>
-                        <p>Bookmaker: {bookmaker}</p>
-                        <p>Bet Amount: $<span class="bet-amount" data-implied-prob="{implied_prob}">0.00</span></p>
-                    </div>
-                """
-        
-        opportunities_html += """
-            </div>
-            <div class="profit-payout">
-                <p>Profit: $<span class="profit">0.00</span></p>
-                <p>Payout: $<span class="payout">0.00</span></p>
-            </div>
+            if arb.get('market') == 'spreads':
+                spread = f"+{arb['points']}" if outcome == 'Underdog' else f"-{arb['points']}"
+                label = f"{outcome} ({spread})"
+            else:
+                label = outcome
+            
+            opportunities_html += f"""
+                <div>
+                    <h3>{label}</h3>
+                    <p>Odds: {odd:.2f}</p>
+                    <p>Bookmaker: {bookmaker}</p>
+                    <p>Bet Amount: $<span class="bet-amount" data-implied-prob="{implied_prob}">0.00</span></p>
+                </div>
+            """
+    
+    opportunities_html += """
         </div>
-        """
+        <div class="profit-payout">
+            <p>Profit: $<span class="profit">0.00</span></p>
+            <p>Payout: $<span class="payout">0.00</span></p>
+        </div>
+    </div>
+    """
 
-    return html_template.format(
-        total_events=data['total_events'],
-        total_arbs=data['total_arbitrage_opportunities'],
-        opportunities=opportunities_html
-    )
+    return opportunities_html
+
+LIVE_SCRIPT = """
+<script>
+    function applyChange(change) {
+        const container = document.getElementById('opportunities');
+        if (change.type === 'summary') {
+            document.getElementById('total-events').textContent = change.total_events;
+            return;
+        }
+        const existing = document.getElementById(change.key);
+        if (existing) {
+            existing.remove();
+        }
+        if (change.type !== 'expired') {
+            const template = document.createElement('template');
+            template.innerHTML = change.html.trim();
+            const card = template.content.firstElementChild;
+            // Keep the cards ordered by profit margin, highest first
+            const next = Array.from(container.children).find(
+                opp => parseFloat(opp.getAttribute('data-profit-margin')) < change.profit_margin);
+            container.insertBefore(card, next || null);
+            updateOpportunity(card, parseFloat(document.getElementById('wager').value) || 0);
+        }
+        document.getElementById('total-arbs').textContent = container.children.length;
+    }
+
+    const source = new EventSource('/events');
+    source.onmessage = message => applyChange(JSON.parse(message.data));
+</script>
+"""
+
+class LiveResults:
+    """
+    Current opportunities from a JSON Lines results stream (main.py --sink),
+    fanned out to the connected browsers as change events.
+
+    Watch-mode records (new, updated, expired) are applied as they are.
+    Single-run 'opportunity' records are upserts, and the run's 'summary'
+    record expires those from earlier runs that were not found again.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.opportunities = {}  # key -> arb
+        self.run_keys = set()  # keys seen in the current single run
+        self.total_events = None
+        self.clients = []
+
+    def apply(self, record):
+        record_type = record.get('type')
+        events = []
+        with self.lock:
+            if record_type == 'summary':
+                for key in list(self.opportunities):
+                    if key not in self.run_keys and self.opportunities[key][1]:
+                        del self.opportunities[key]
+                        events.append({'type': 'expired', 'key': key})
+                self.run_keys = set()
+                self.total_events = record.get('total_events')
+                events.append({'type': 'summary', 'total_events': self.total_events})
+            elif record_type in ('opportunity', 'new', 'updated'):
+                arb = record['opportunity']
+                key = record.get('key') or f"{arb.get('event_id') or arb['event']}:{arb['market']}"
+                single_run = record_type == 'opportunity'
+                if single_run:
+                    self.run_keys.add(key)
+                change_type = 'updated' if key in self.opportunities else 'new'
+                self.opportunities[key] = (arb, single_run)
+                events.append(self.change_event(change_type, key, arb))
+            elif record_type == 'expired':
+                if self.opportunities.pop(record['key'], None) is not None:
+                    events.append({'type': 'expired', 'key': record['key']})
+            self.publish(events)
+
+    def reset(self):
+        with self.lock:
+            events = [{'type': 'expired', 'key': key} for key in self.opportunities]
+            self.opportunities = {}
+            self.run_keys = set()
+            self.publish(events)
+
+    def change_event(self, change_type, key, arb):
+        return {'type': change_type, 'key': key, 'profit_margin': arb['profit_margin'],
+                'html': opportunity_html(arb, key)}
+
+    def publish(self, events):
+        for client in self.clients:
+            for event in events:
+                client.put(event)
+
+    def subscribe(self):
+        """Queue of events for a new browser, starting with the current state."""
+        client = queue.Queue()
+        with self.lock:
+            for key, (arb, _) in self.opportunities.items():
+                client.put(self.change_event('new', key, arb))
+            if self.total_events is not None:
+                client.put({'type': 'summary', 'total_events': self.total_events})
+            self.clients.append(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self.lock:
+            self.clients.remove(client)
+
+def follow_results(path, results, stop, poll_interval=0.5):
+    """Apply every record in the JSON Lines file at path, then keep tailing it."""
+    position = 0
+    buffer = b''
+    while not stop.is_set():
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        if size is not None and size < position:
+            # The file was truncated or replaced, so start over
+            position = 0
+            buffer = b''
+            results.reset()
+        if size is not None and size > position:
+            with open(path, 'rb') as f:
+                f.seek(position)
+                buffer += f.read()
+                position = f.tell()
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    results.apply(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    print(f"Skipping malformed result record: {e}")
+        stop.wait(poll_interval)
+
+class LiveHandler(BaseHTTPRequestHandler):
+    results = None
+    page = None
+
+    def do_GET(self):
+        if self.path in ('/', '/index.html'):
+            body = self.page.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/events':
+            self.stream_events()
+        else:
+            self.send_error(404)
+
+    def stream_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        client = self.results.subscribe()
+        try:
+            while True:
+                try:
+                    message = f"data: {json.dumps(client.get(timeout=15))}\n\n"
+                except queue.Empty:
+                    message = ": keep-alive\n\n"
+                self.wfile.write(message.encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.results.unsubscribe(client)
+
+    def log_message(self, format, *args):
+        pass
+
+def run_live_server(results_file, port=8000):
+    results = LiveResults()
+    stop = threading.Event()
+    follower = threading.Thread(target=follow_results, args=(results_file, results, stop), daemon=True)
+    follower.start()
+
+    LiveHandler.results = results
+    LiveHandler.page = render_page('-', 0, '', LIVE_SCRIPT)
+    httpd = ThreadingHTTPServer(('', port), LiveHandler)
+    httpd.daemon_threads = True
+    print(f"Live viewer following {results_file} on http://localhost:{port}")
+    return httpd, stop
 
 def run_server(port=8000):
     server_address = ('', port)
@@ -213,10 +426,31 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 def main():
-    signal.signal(signal.SIGINT, signal_handler)
+    parser = argparse.ArgumentParser(description="View arbitrage opportunities in the browser")
+    parser.add_argument("--live", type=str, metavar="FILE", help="Follow a JSON Lines results stream (main.py --sink FILE) and update the page as opportunities change")
+    parser.add_argument("--port", type=int, default=8000, help="Port to serve the viewer on")
+    args = parser.parse_args()
+
+    if args.live:
+        httpd, stop = run_live_server(args.live, args.port)
+        webbrowser.open(f'http://localhost:{args.port}/')
+        print("Press Ctrl+C to stop the server and exit.")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nExiting the viewer. Goodbye!")
+        finally:
+            stop.set()
+            httpd.server_close()
+        return
 
     with open('arbitrage_results.json', 'r') as f:
         data = json.load(f)
+    serve_results(data, args.port)
+
+def serve_results(data, port=8000):
+    """Render results into arbitrage_viewer.html and serve it until Ctrl+C."""
+    signal.signal(signal.SIGINT, signal_handler)
 
     html_content = generate_html(data)
     
@@ -224,12 +458,12 @@ def main():
         f.write(html_content)
 
     # Start the server in a separate thread
-    server_thread = threading.Thread(target=run_server)
+    server_thread = threading.Thread(target=run_server, args=(port,))
     server_thread.daemon = True
     server_thread.start()
 
     # Open the default web browser
-    webbrowser.open('http://localhost:8000/arbitrage_viewer.html')
+    webbrowser.open(f'http://localhost:{port}/arbitrage_viewer.html')
 
     print("Press Ctrl+C to stop the server and exit.")
     try:
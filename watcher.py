@@ -0,0 +1,230 @@
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+from price_index import BestPriceIndex
+from scheduler import RequestScheduler
+
+
+class ArbitrageWatcher:
+    """
+    Long-running polling loop around an ArbitrageFinder.
+
+    The watcher keeps a fingerprint of every event's bookmaker prices from
+    the previous poll and only recomputes arbitrage for events whose prices
+    changed. Each poll returns change records for opportunities that are
+    new, updated or expired since the last poll. Which sports are polled
+    on each cycle is left to a RequestScheduler. A BestPriceIndex takes
+    each changed event's moved quotes and skips the full recompute when no
+    market can clear the cutoff.
+    """
+
+    def __init__(self, finder, interval, min_remaining=0, sports_refresh=3600, max_interval=1800, budget_horizon=None):
+        self.finder = finder
+        self.config = finder.config
+        self.odds_api = finder.odds_api
+        self.interval = interval
+        self.min_remaining = min_remaining
+        self.sports_refresh = sports_refresh
+        self.sports = []
+        self.sports_fetched_at = None
+        self.fingerprints = {}  # event id -> price fingerprint from the last poll
+        self.event_opportunities = {}  # event id -> {opportunity key: arb}
+        self.event_sports = {}  # event id -> sport key
+        self.polls = 0
+        self.skipped_events = 0
+        # A '-' sink already writes every change record to stdout
+        self.stdout_sink = any(spec in ('-', 'stdout') for spec in self.config.sinks)
+        self.prices = BestPriceIndex(self.config.markets, finder.implied_limit(), finder.standardize_team_name)
+        # A cached response would hide price changes until its TTL ran out
+        # and still be charged for by the scheduler
+        self.odds_api.read_odds_cache = False
+        self.scheduler = RequestScheduler(self.odds_api, interval, max_interval=max_interval,
+                                          budget_horizon=budget_horizon, min_remaining=min_remaining)
+
+    def run(self):
+        """Poll until interrupted or until the request budget runs out."""
+        try:
+            while True:
+                started = time.monotonic()
+                if not self.has_budget():
+                    print("Stopping watch mode: remaining API requests are at the configured reserve.", file=sys.stderr)
+                    break
+                for change in self.poll():
+                    self.emit(change)
+                if self.odds_api.api_limit_reached:
+                    if not self.is_throttled():
+                        print("Stopping watch mode: API request limit reached.", file=sys.stderr)
+                        break
+                    logging.warning("API throttled the watcher. Backing off.")
+                    self.scheduler.back_off()
+                    self.odds_api.clear_limit_reached()
+                else:
+                    self.scheduler.recover()
+                time.sleep(max(0, self.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            print("\nStopping watch mode.", file=sys.stderr)
+        return self.current_opportunities()
+
+    def poll(self):
+        self.refresh_sports()
+        if not self.sports:
+            logging.error("Failed to fetch sports data")
+            return []
+
+        self.polls += 1
+        changes = []
+        due = self.scheduler.due_sports(self.sports, self.odds_api.remaining_requests)
+        polled_sports = set()
+        seen_events = set()
+        changed_events = 0
+        skipped_before = self.skipped_events
+
+        for sport_key, odds in self.odds_api.get_all_odds(due):
+            if not odds and self.odds_api.api_limit_reached:
+                # Nothing was fetched, so keep the sport's last known state
+                continue
+            polled_sports.add(sport_key)
+            sport_arbs = 0
+            started = time.perf_counter()
+            sport_changed = sport_skipped = 0
+            for event in odds or []:
+                event_id = self.event_key(event)
+                seen_events.add(event_id)
+                self.event_sports[event_id] = sport_key
+                fingerprint = self.fingerprint(event)
+                if self.fingerprints.get(event_id) == fingerprint:
+                    continue
+                self.fingerprints[event_id] = fingerprint
+                sport_changed += 1
+                self.prices.update_event(event_id, event)
+                if not self.prices.may_have_arbitrage(event_id):
+                    # Any opportunities it had are now expired
+                    sport_skipped += 1
+                    changes.extend(self.update_event(event_id, sport_key, []))
+                    continue
+                try:
+                    arbs = self.finder.arbitrage_engine.calculate_arbitrage([event])
+                except Exception as e:
+                    logging.error("Error processing event %s: %s", event_id, e)
+                    continue
+                changes.extend(self.update_event(event_id, sport_key, arbs))
+            metrics = self.finder.metrics
+            metrics.add_time('analyze', time.perf_counter() - started, sport_key)
+            metrics.count('events', len(odds or []), sport_key)
+            metrics.count('changed_events', sport_changed, sport_key)
+            metrics.count('skipped_events', sport_skipped, sport_key)
+            changed_events += sport_changed
+            self.skipped_events += sport_skipped
+            for event in odds or []:
+                sport_arbs += len(self.event_opportunities.get(self.event_key(event), {}))
+            self.scheduler.record(sport_key, odds or [], sport_arbs)
+
+        for event_id in list(self.fingerprints):
+            if self.event_sports.get(event_id) in polled_sports and event_id not in seen_events:
+                changes.extend(self.update_event(event_id, self.event_sports.get(event_id), []))
+                del self.fingerprints[event_id]
+                self.event_sports.pop(event_id, None)
+                self.prices.remove(event_id)
+
+        logging.info("Poll %d: %d sports, %d events, %d changed, %d skipped by the price index, %d opportunity changes",
+                     self.polls, len(polled_sports), len(seen_events), changed_events,
+                     self.skipped_events - skipped_before, len(changes))
+        return changes
+
+    def refresh_sports(self):
+        now = time.monotonic()
+        if self.sports and self.sports_fetched_at is not None and now - self.sports_fetched_at < self.sports_refresh:
+            return
+        sports = self.odds_api.get_sports()
+        if sports:
+            self.sports = sports
+            self.sports_fetched_at = now
+
+    def has_budget(self):
+        """True while the remaining credits can pay for a poll without going below the reserve."""
+        remaining = self.odds_api.remaining_requests
+        if remaining is None or self.config.offline_file:
+            return True
+        costs = [self.scheduler.request_cost(sport['key']) for sport in self.sports]
+        cheapest = min((cost for cost in costs if cost), default=0)
+        return float(remaining) - cheapest >= self.min_remaining
+
+    def is_throttled(self):
+        # A 429 with credits left is a rate limit we can wait out; an empty
+        # quota or an authorization failure is not.
+        remaining = self.odds_api.remaining_requests
+        return (self.odds_api.last_error_status == 429 and
+                (remaining is None or float(remaining) > self.min_remaining))
+
+    def update_event(self, event_id, sport_key, arbs):
+        previous = self.event_opportunities.pop(event_id, {})
+        current = {self.opportunity_key(event_id, arb): arb for arb in arbs}
+        if current:
+            self.event_opportunities[event_id] = current
+
+        changes = []
+        for key, arb in current.items():
+            if key not in previous:
+                changes.append(self.change('new', key, sport_key, arb))
+            elif self.opportunity_changed(previous[key], arb):
+                changes.append(self.change('updated', key, sport_key, arb))
+        for key, arb in previous.items():
+            if key not in current:
+                changes.append(self.change('expired', key, sport_key, arb))
+        return changes
+
+    def opportunity_changed(self, old, new):
+        return any(old.get(field) != new.get(field) for field in ('profit_margin', 'best_odds', 'bookmakers', 'points'))
+
+    def change(self, change_type, key, sport_key, arb):
+        return {
+            'type': change_type,
+            'key': key,
+            'sport': sport_key,
+            'detected_at': datetime.now(timezone.utc).isoformat(),
+            'opportunity': arb
+        }
+
+    def emit(self, change):
+        if self.finder.sink:
+            self.finder.sink.emit(change)
+        if self.config.unformatted:
+            if not self.stdout_sink:
+                print(json.dumps(change))
+            return
+        arb = change['opportunity']
+        # Keep stdout clean for the JSON lines when streaming to it
+        print(f"[{change['type']}] {arb['event']} ({arb['market']}): {arb['profit_margin']:.2f}% profit margin",
+              file=sys.stderr if self.stdout_sink else sys.stdout)
+
+    def current_opportunities(self):
+        arbs = [arb for opportunities in self.event_opportunities.values() for arb in opportunities.values()]
+        return {
+            "total_events": len(self.fingerprints),
+            "total_arbitrage_opportunities": len(arbs),
+            "markets": self.config.markets,
+            "arbitrage_opportunities": arbs,
+            "api_usage": {
+                "remaining_requests": self.odds_api.remaining_requests,
+                "used_requests": self.odds_api.used_requests
+            } if not self.config.offline_file else None,
+            "metrics": self.finder.metrics.snapshot()
+        }
+
+    def event_key(self, event):
+        return event.id or f"{event.home_team} vs {event.away_team}@{event.commence_time}"
+
+    def opportunity_key(self, event_id, arb):
+        return f"{event_id}:{arb['market']}"
+
+    def fingerprint(self, event):
+        quotes = []
+        for key in self.config.api_markets:
+            market = event.markets.get(key)
+            if market is not None:
+                quotes.append((key, tuple(bookmaker.title for bookmaker in market.bookmakers),
+                               tuple(market.names), tuple(market.prices), tuple(market.points)))
+        quotes.append(event.commence_time)
+        return tuple(quotes)